@@ -0,0 +1,40 @@
+"""otp lookup composite index
+
+Revision ID: 3b7f0c2d9a41
+Revises: e4c9d16172bb
+Create Date: 2026-10-18 11:03:17.548120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7f0c2d9a41'
+down_revision: Union[str, None] = 'e4c9d16172bb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run in a transaction; it doesn't block send-otp's inserts while it builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_auth_otps_email_purpose_used_created_at',
+            'auth_otps',
+            ['email', 'purpose', 'used', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # email is the leading column of the composite index, the single-column one is redundant
+        op.drop_index(op.f('ix_auth_otps_email'), table_name='auth_otps', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_auth_otps_email'), 'auth_otps', ['email'], unique=False, postgresql_concurrently=True)
+        op.drop_index(
+            'ix_auth_otps_email_purpose_used_created_at', table_name='auth_otps', postgresql_concurrently=True
+        )
@@ -0,0 +1,35 @@
+"""user keyset pagination index
+
+Revision ID: 5f1a8e3b7c20
+Revises: 9d2e4a7c1f08
+Create Date: 2026-10-18 14:12:40.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1a8e3b7c20'
+down_revision: Union[str, None] = '9d2e4a7c1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run in a transaction; it doesn't block writes to user while it builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_created_at_id',
+            'user',
+            [sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_created_at_id', table_name='user', postgresql_concurrently=True)
@@ -0,0 +1,57 @@
+"""role resource permission tables
+
+Revision ID: 9d2e4a7c1f08
+Revises: 3b7f0c2d9a41
+Create Date: 2026-10-18 13:27:55.904316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2e4a7c1f08'
+down_revision: Union[str, None] = '3b7f0c2d9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('role',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.Enum('active', 'inactive', name='role_status'), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_role_id'), 'role', ['id'], unique=False)
+    op.create_table('resource',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('is_deleted', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_resource_id'), 'resource', ['id'], unique=False)
+    op.create_table('permission',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('role_id', sa.Integer(), nullable=False),
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('access_type', sa.String(length=20), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('role_id', 'resource_id', name='uq_permission_role_resource')
+    )
+    op.create_index(op.f('ix_permission_id'), 'permission', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_permission_id'), table_name='permission')
+    op.drop_table('permission')
+    op.drop_index(op.f('ix_resource_id'), table_name='resource')
+    op.drop_table('resource')
+    op.drop_index(op.f('ix_role_id'), table_name='role')
+    op.drop_table('role')
+    sa.Enum(name='role_status').drop(op.get_bind(), checkfirst=True)
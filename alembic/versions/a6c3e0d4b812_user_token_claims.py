@@ -0,0 +1,42 @@
+"""user token claims
+
+Revision ID: a6c3e0d4b812
+Revises: 5f1a8e3b7c20
+Create Date: 2026-10-18 16:41:09.527113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e0d4b812'
+down_revision: Union[str, None] = '5f1a8e3b7c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('user_type', sa.String(length=20), server_default='user', nullable=False))
+    op.add_column('user', sa.Column('role_id', sa.Integer(), nullable=True))
+    op.add_column('user', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+    # CONCURRENTLY can't run in a transaction; it doesn't block writes to user while it builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_token_version_revoked',
+            'user',
+            ['id', 'token_version'],
+            unique=False,
+            postgresql_where=sa.text('token_version > 0'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_token_version_revoked', table_name='user', postgresql_concurrently=True)
+    op.drop_column('user', 'token_version')
+    op.drop_column('user', 'role_id')
+    op.drop_column('user', 'user_type')
@@ -0,0 +1,84 @@
+"""refresh token hash lookup
+
+Revision ID: e4c9d16172bb
+Revises: fe82acd714b2
+Create Date: 2026-10-18 10:12:41.203511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c9d16172bb'
+down_revision: Union[str, None] = 'fe82acd714b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+BACKFILL_SQL = (
+    "UPDATE auth_refresh_tokens "
+    "SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex'), token = NULL "
+    "WHERE token_hash IS NULL"
+)
+
+
+def _dedupe(conn) -> None:
+    # tokens issued in the same second for the same user were byte-identical:
+    # keep the oldest row, revoked if any copy was revoked
+    conn.execute(sa.text(
+        "UPDATE auth_refresh_tokens t SET revoked = true "
+        "FROM (SELECT token_hash FROM auth_refresh_tokens GROUP BY token_hash "
+        "      HAVING count(*) > 1 AND bool_or(coalesce(revoked, false))) d "
+        "WHERE t.token_hash = d.token_hash"
+    ))
+    conn.execute(sa.text(
+        "DELETE FROM auth_refresh_tokens a USING auth_refresh_tokens b "
+        "WHERE a.token_hash = b.token_hash AND a.id > b.id"
+    ))
+
+
+def upgrade() -> None:
+    op.add_column('auth_refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    # the backfill clears the plaintext token, so it has to be nullable first
+    op.alter_column('auth_refresh_tokens', 'token', existing_type=sa.Text(), nullable=True)
+
+    # backfill in primary key ranges, each batch committed on its own, so row locks are
+    # held for one batch rather than until the end of the migration; the plaintext
+    # token is dropped as soon as its hash is written
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        max_id = conn.execute(sa.text("SELECT coalesce(max(id), 0) FROM auth_refresh_tokens")).scalar()
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            conn.execute(
+                sa.text(BACKFILL_SQL + " AND id >= :start AND id < :end"),
+                {"start": start, "end": start + BACKFILL_BATCH_SIZE},
+            )
+
+    # rows the old code wrote while the backfill ran, deduplicated along with the rest
+    op.execute(BACKFILL_SQL)
+    _dedupe(op.get_bind())
+    op.alter_column('auth_refresh_tokens', 'token_hash', existing_type=sa.String(length=64), nullable=False)
+
+    # built last, once no duplicate hash can be left; CONCURRENTLY can't run in a
+    # transaction and doesn't block writes while it builds
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_auth_refresh_tokens_token_hash'),
+            'auth_refresh_tokens',
+            ['token_hash'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    # the upgrade drops every plaintext token; none of these rows can be used by the old code
+    op.execute("DELETE FROM auth_refresh_tokens WHERE token IS NULL")
+    op.alter_column('auth_refresh_tokens', 'token', existing_type=sa.Text(), nullable=False)
+    op.drop_index(op.f('ix_auth_refresh_tokens_token_hash'), table_name='auth_refresh_tokens')
+    op.drop_column('auth_refresh_tokens', 'token_hash')
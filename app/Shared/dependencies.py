@@ -2,8 +2,7 @@ from typing import Annotated, Literal
 from fastapi import Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 
-from app.user.models import Permission, Resource, Role
-
+from .permissions import permission_matrix
 from .schema import PaginationOptions
 
 from ..core.db import session as _database
@@ -17,7 +16,8 @@ def get_db():
         db.close()
 
 
-async def get_user(request: Request, db: Annotated[Session, Depends(get_db)]):
+async def get_user(request: Request):
+    # the verified token claims (app.Shared.token_claims); no session needed
     return request.state.user
 
 
@@ -29,21 +29,20 @@ def get_pagination_options(
     _offset: Annotated[
         int | None, Query(description="How many results to skip")
     ] = None,
+    _cursor: Annotated[
+        str | None,
+        Query(description="next_cursor of the previous page; takes precedence over _offset"),
+    ] = None,
 ):
-    return PaginationOptions(limit=_limit, offset=_offset)
+    return PaginationOptions(limit=_limit, offset=_offset, cursor=_cursor)
 
 
 def get_module_permission(module: str, request_type: Literal["read","write","delete"]):
-    def get_permission(request: Request, db: Annotated[Session, Depends(get_db)]):
+    def get_permission(request: Request):
         user = request.state.user
-        if user["user_type"] != "staff":
+        if user.get("user_type") != "staff":
             return
-        access_type = (
-            db.query(Permission.access_type)
-            .join(Resource, Resource.id == Permission.resource_id)
-            .filter(Resource.name == module, Permission.role_id == user["role_id"])
-            .scalar()
-        )
+        access_type = permission_matrix.access_type(user.get("role_id"), module)
         if access_type == "full_access":
             return
         if request_type == "delete":
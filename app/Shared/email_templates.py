@@ -0,0 +1,101 @@
+# app/Shared/email_templates.py
+"""
+Precompiled email templates.
+
+Templates are read once, split into static chunks and `{slot}` positions, and
+rendered by filling the slots and joining. The OTP message is assembled as a
+multipart/alternative (plain text + HTML) string directly, with encoded
+headers cached, instead of building and flattening an email.mime tree per
+message.
+"""
+import base64
+import re
+import uuid
+from email.header import Header
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+_SLOT = re.compile(r"\{(\w+)\}")
+_TAG = re.compile(r"<[^>]+>")
+
+
+class CompiledTemplate:
+    def __init__(self, source: str):
+        # re.split with one group alternates static text and slot names
+        self._chunks: List[str] = _SLOT.split(source)
+        self._slots: Tuple[Tuple[int, str], ...] = tuple(
+            (i, self._chunks[i]) for i in range(1, len(self._chunks), 2)
+        )
+        self.slot_names = frozenset(name for _, name in self._slots)
+
+    def render(self, **values: str) -> str:
+        chunks = self._chunks.copy()
+        for i, name in self._slots:
+            chunks[i] = values[name]
+        return "".join(chunks)
+
+
+def _load(name: str) -> CompiledTemplate:
+    return CompiledTemplate((TEMPLATE_DIR / name).read_text(encoding="utf-8"))
+
+
+OTP_HTML = _load("otp_email.html")
+OTP_TEXT = _load("otp_email.txt")
+
+
+@lru_cache(maxsize=256)
+def encode_header(value: str) -> str:
+    """RFC 2047-encode a header value; ASCII values pass through unchanged."""
+    if value.isascii():
+        return value
+    return Header(value, "utf-8").encode()
+
+
+@lru_cache(maxsize=64)
+def html_to_text(html: str) -> str:
+    """Plain-text alternative of the (small, fixed) intro messages the routes pass in."""
+    return _TAG.sub("", html)
+
+
+def _part(content_type: str, body: str) -> str:
+    if body.isascii():
+        return f'Content-Type: {content_type}; charset="us-ascii"\r\nContent-Transfer-Encoding: 7bit\r\n\r\n{body}'
+    encoded = base64.encodebytes(body.encode("utf-8")).decode("ascii")
+    return f'Content-Type: {content_type}; charset="utf-8"\r\nContent-Transfer-Encoding: base64\r\n\r\n{encoded}'
+
+
+def _crlf(text: str) -> str:
+    return text.replace("\r\n", "\n").replace("\n", "\r\n")
+
+
+def build_message(sender: str, recipient: str, subject: str, text: str, html: str) -> str:
+    """multipart/alternative message ready for SMTP sendmail."""
+    boundary = f"=={uuid.uuid4().hex}=="
+    return "".join((
+        f"From: {encode_header(sender)}\r\n",
+        f"To: {recipient}\r\n",
+        f"Subject: {encode_header(subject)}\r\n",
+        "MIME-Version: 1.0\r\n",
+        f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n',
+        "\r\n",
+        f"--{boundary}\r\n",
+        _crlf(_part("text/plain", text)),
+        f"\r\n--{boundary}\r\n",
+        _crlf(_part("text/html", html)),
+        f"\r\n--{boundary}--\r\n",
+    ))
+
+
+def render_otp_email(otp: str, message: str) -> Dict[str, str]:
+    return {
+        "html": OTP_HTML.render(message=message, otp=otp),
+        "text": OTP_TEXT.render(message=html_to_text(message), otp=otp),
+    }
+
+
+def build_otp_message(sender: str, recipient: str, subject: str, otp: str, message: str) -> str:
+    rendered = render_otp_email(otp, message)
+    return build_message(sender, recipient, subject, rendered["text"], rendered["html"])
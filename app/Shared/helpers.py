@@ -1,29 +1,32 @@
 # app/Shared/helpers.py
-import os
 import time
-from dotenv import load_dotenv
 import jwt
 import secrets
-from datetime import datetime, timedelta
-from typing import Dict, Any
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, Optional
 import re
-from passlib.context import CryptContext
 import fastapi as _fastapi
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-
-load_dotenv(".env")
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-JWT_SECRET = os.getenv("JWT_SECRET")
-ACCESS_TOKEN_EXPIRE_SECONDS = int(os.getenv("ACCESS_TOKEN_EXPIRE_SECONDS", "900"))  # 15 minutes default
-REFRESH_TOKEN_EXPIRE_SECONDS = int(os.getenv("REFRESH_TOKEN_EXPIRE_SECONDS", str(60 * 60 * 24 * 7)))  # 7 days
-SENDER_EMAIL = os.getenv("SENDER_EMAIL", "qamber.qsol@gmail.com")
-SENDER_PASSWORD = os.getenv("SENDER_PASSWORD", "rswiitydiojgupnh")
-SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+from app.core import config as _config
+from app.Shared import password_hasher as _hasher
+from app.Shared import signing_keys as _keys
+from app.Shared.token_cache import TokenCache
+from app.Shared.smtp_pool import SMTPConnectionPool
+from app.Shared import email_templates as _templates
+
+
+settings = _config.get_settings()
+
+smtp_pool = SMTPConnectionPool(
+    settings.smtp_server,
+    settings.smtp_port,
+    username=settings.sender_email,
+    password=settings.sender_password,
+    max_sessions=settings.smtp_max_sessions,
+    noop_after_seconds=settings.smtp_noop_after_seconds,
+    starttls=settings.smtp_starttls,
+)
+token_cache = TokenCache(maxsize=settings.token_cache_size, token_max_age=settings.jwt_expiry_seconds)
 
 EMAIL_REGEX = re.compile(r"^(?=.{1,254}$)[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
 
@@ -34,80 +37,91 @@ def validate_email(email: str) -> bool:
     return bool(EMAIL_REGEX.match(email))
 
 def hash_password(password: str) -> str:
-    return pwd_ctx.hash(password)
+    return _hasher.hash_password_sync(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    try:
-        return pwd_ctx.verify(plain, hashed)
-    except Exception:
-        return False
+    return _hasher.verify_password_sync(plain, hashed)
 
-def create_access_token(user_id: int) -> str:
+def create_access_token(user_id: int, claims: Optional[Dict[str, Any]] = None) -> str:
+    """:param claims: app.Shared.token_claims.claims_for(user), read by authorization instead of the user row."""
+    settings = _config.get_settings()
     try:
         now = datetime.utcnow()
         payload = {
+            **(claims or {}),
             "sub": str(user_id),
             "type": "access",
             "iat": now,
-            "exp": now + timedelta(seconds=ACCESS_TOKEN_EXPIRE_SECONDS)
+            "exp": now + settings.access_token_expire
         }
-        token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+        # EdDSA/ES256 with the current kid, HS256 when no JWT_KEYS are configured
+        token = _keys.get_key_ring().encode(payload)
         return token
     except Exception:
         raise _fastapi.HTTPException(status_code=500, detail="Failed to create access token")
 
-def create_refresh_token(user_id: int) -> str:
+def create_refresh_token(user_id: int, token_version: int = 0) -> str:
+    settings = _config.get_settings()
     try:
         now = datetime.utcnow()
         payload = {
             "sub": str(user_id),
+            "ver": token_version,
             "type": "refresh",
+            "jti": secrets.token_hex(16),  # refresh tokens are stored by digest, keep them unique
             "iat": now,
-            "exp": now + timedelta(seconds=REFRESH_TOKEN_EXPIRE_SECONDS)
+            "exp": now + settings.refresh_token_expire
         }
-        token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+        # EdDSA/ES256 with the current kid, HS256 when no JWT_KEYS are configured
+        token = _keys.get_key_ring().encode(payload)
         return token
     except Exception:
         raise _fastapi.HTTPException(status_code=500, detail="Failed to create refresh token")
 
 def decode_token(token: str) -> Dict[str, Any]:
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    """
+    Verify and decode a JWT, served from `token_cache` when the token was already verified
+    by a key that is still published.
+    The returned payload is shared with the cache and must not be mutated.
+    """
+    ring = _keys.get_key_ring()
+    # a hit still has to be signed by a key that's published now (not retired since)
+    payload = token_cache.get(token, ring.accepts)
+    if payload is not None:
         return payload
+    try:
+        # the key is picked by the token's kid, public keys are parsed once (app.Shared.signing_keys)
+        payload = ring.decode(token)
+        kid = jwt.get_unverified_header(token).get("kid")
     except jwt.ExpiredSignatureError:
         raise _fastapi.HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise _fastapi.HTTPException(status_code=401, detail="Invalid token")
+    expires_at = token_cache.expires_at(payload)
+    if expires_at is not None and expires_at <= time.time():
+        raise _fastapi.HTTPException(status_code=401, detail="Token expired")
+    token_cache.put(token, payload, kid)
+    return payload
+
+def hash_token(token: str) -> str:
+    """Fixed-length lookup key for a refresh token (auth_refresh_tokens.token_hash)."""
+    return hashlib.sha256(token.encode()).hexdigest()
 
 def create_otp(length: int = 6) -> str:
     return "".join(secrets.choice("0123456789") for _ in range(length))
 
 def send_email(recipient_email: str, subject: str, html_text: str, otp: str) -> bool:
+    settings = _config.get_settings()
+    if not settings.sender_password:
+        print("Error sending email via Gmail SMTP: SENDER_PASSWORD is not configured")
+        return False
     try:
-        # Build your final HTML body
-        html_body = generate_otp_email_html(otp, html_text)
-
-        # Create the email message
-        message = MIMEMultipart("alternative")
-        message["From"] = SENDER_EMAIL
-        message["To"] = recipient_email
-        message["Subject"] = subject
-
-        # Attach the HTML body
-        html_part = MIMEText(html_body, "html")
-        message.attach(html_part)
+        # multipart text + HTML body from the precompiled OTP templates
+        sender = settings.sender_email
+        message = _templates.build_otp_message(sender, recipient_email, subject, otp, html_text)
 
-        # Gmail SMTP connection
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()  # Secure connection
-
-        # Login using Gmail App Password
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-
-        # Send email
-        server.sendmail(SENDER_EMAIL, recipient_email, message.as_string())
-
-        server.quit()
+        # pooled, already authenticated Gmail SMTP session
+        smtp_pool.send(sender, recipient_email, message)
 
         print("Email sent successfully via Gmail SMTP!")
         return True
@@ -130,35 +144,4 @@ def generate_otp_email_html(otp: str, message: str = None) -> str:
             "Use the following OTP to complete your sign-up procedure. "
             "This OTP is valid for <strong>5 minutes</strong>."
         )
-    
-    html_body = f"""
-    <div style="font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; min-width: 1000px; overflow: auto; line-height: 1.6; background-color: #f9f9f9; padding: 40px 0;">
-      <div style="margin: 0 auto; width: 600px; background-color: #ffffff; border-radius: 10px; box-shadow: 0 4px 20px rgba(0,0,0,0.05); overflow: hidden;">
-        
-        <!-- Header -->
-        <div style="background-color: #1a73e8; padding: 20px; text-align: center;">
-          <a href="#" style="font-size: 1.6em; color: #ffffff; text-decoration: none; font-weight: 700;">Link Nest</a>
-        </div>
-        
-        <!-- Body -->
-        <div style="padding: 30px 40px; text-align: center;">
-          
-          <p style="font-size: 1em; color: #555555; margin-bottom: 30px;">
-            {message}
-          </p>
-          
-          <!-- OTP -->
-          <div style="display: inline-block; background-color: #1a73e8; color: #ffffff; font-size: 1.5em; font-weight: 700; padding: 15px 25px; border-radius: 8px; letter-spacing: 3px;">
-            {otp}
-          </div>
-          
-          <p style="font-size: 0.9em; color: #777777; margin-top: 30px;">
-            Regards,<br>
-            <strong>Link Nest Team</strong>
-          </p>
-        </div>
-        
-      </div>
-    </div>
-    """
-    return html_body
+    return _templates.OTP_HTML.render(message=message, otp=otp)
@@ -0,0 +1,121 @@
+# app/Shared/pagination.py
+"""
+Keyset (cursor) pagination for list endpoints.
+
+OFFSET n makes the database walk and throw away n rows, so deep pages get
+linearly slower. Keyset pagination remembers the sort key of the last row
+served and seeks past it instead:
+
+    WHERE (created_at, id) < (:last_created_at, :last_id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit + 1
+
+which an index on (created_at, id) answers in the same time on every page.
+The key of the last row travels to the client as an opaque cursor, signed
+so it can't be forged into an arbitrary predicate.
+
+    paginator = KeysetPaginator(User.created_at, User.id)
+    page = paginator.paginate(db, select(User).where(...), options)   # {"items": [...], "next_cursor": "..."}
+
+Works with 2.0-style select() (sync and async sessions) and legacy Query objects.
+"""
+import os
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+from fastapi import HTTPException
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app.core import config as _config
+from .schema import PaginationOptions
+
+PAGINATION_DEFAULT_LIMIT = int(os.getenv("PAGINATION_DEFAULT_LIMIT", "20"))
+PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", "100"))
+
+
+class KeysetPaginator:
+    def __init__(self, *keys, descending: bool = True, secret: Optional[str] = None):
+        """
+        :param keys: columns that make up the sort key, most significant first; the last one
+            must be unique (usually the primary key) so the order is total.
+        :param secret: cursor signing key, PAGINATION_CURSOR_SECRET (falling back to JWT_SECRET) by default.
+        """
+        if not keys:
+            raise ValueError("KeysetPaginator needs at least one key column")
+        self.keys = keys
+        self.descending = descending
+        # salted per key set, so a cursor from one listing is rejected by another
+        salt = "cursor:" + ",".join(str(key) for key in keys)
+        if secret is None:
+            secret = _config.get_settings().pagination_cursor_secret
+        self._serializer = URLSafeSerializer(secret, salt=salt)
+
+    # ---- cursors ----
+    def encode_cursor(self, item: Any) -> str:
+        values = [getattr(item, key.key) for key in self.keys]
+        return self._serializer.dumps([v.isoformat() if isinstance(v, (datetime, date)) else v for v in values])
+
+    def decode_cursor(self, cursor: str) -> List[Any]:
+        try:
+            values = self._serializer.loads(cursor)
+        except BadSignature:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        decoded = []
+        try:
+            for key, value in zip(self.keys, values):
+                python_type = key.type.python_type
+                if python_type is datetime:
+                    value = datetime.fromisoformat(value)
+                elif python_type is date:
+                    value = date.fromisoformat(value)
+                decoded.append(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return decoded
+
+    # ---- query building ----
+    def limit_of(self, options: Optional[PaginationOptions]) -> int:
+        limit = options.limit if options and options.limit else PAGINATION_DEFAULT_LIMIT
+        return max(1, min(limit, PAGINATION_MAX_LIMIT))
+
+    def seek(self, stmt, cursor: Optional[str]):
+        """Add the ORDER BY and, if there is a cursor, the seek predicate to `stmt`."""
+        order = [key.desc() if self.descending else key.asc() for key in self.keys]
+        stmt = stmt.order_by(*order)
+        if cursor:
+            last = self.decode_cursor(cursor)
+            columns = _sql.tuple_(*self.keys)
+            values = _sql.tuple_(*[_sql.literal(value, key.type) for key, value in zip(self.keys, last)])
+            stmt = stmt.where(columns < values if self.descending else columns > values)
+        return stmt
+
+    def apply(self, stmt, options: Optional[PaginationOptions]):
+        """
+        Seek + LIMIT limit+1 (the extra row tells whether there's a next page).
+        A plain offset is still honoured on the first page for old clients.
+        """
+        cursor = options.cursor if options else None
+        stmt = self.seek(stmt, cursor).limit(self.limit_of(options) + 1)
+        if not cursor and options and options.offset:
+            stmt = stmt.offset(options.offset)
+        return stmt
+
+    def page(self, rows: Sequence[Any], options: Optional[PaginationOptions]) -> dict:
+        limit = self.limit_of(options)
+        items = list(rows[:limit])
+        next_cursor = self.encode_cursor(items[-1]) if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    # ---- execution ----
+    def paginate(self, db: _orm.Session, stmt, options: Optional[PaginationOptions]) -> dict:
+        stmt = self.apply(stmt, options)
+        rows = stmt.all() if isinstance(stmt, _orm.Query) else db.execute(stmt).scalars().all()
+        return self.page(rows, options)
+
+    async def apaginate(self, db, stmt, options: Optional[PaginationOptions]) -> dict:
+        result = await db.execute(self.apply(stmt, options))
+        return self.page(result.scalars().all(), options)
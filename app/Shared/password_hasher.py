@@ -0,0 +1,199 @@
+# app/Shared/password_hasher.py
+"""
+bcrypt hashing/verification on a bounded process pool.
+
+bcrypt is deliberately slow (~250 ms of CPU), so running it on the request
+thread lets a burst of logins take every core. Work is submitted to a
+process pool sized to the machine, and once PASSWORD_HASH_QUEUE_LIMIT jobs
+are in flight new ones are rejected with 503 + Retry-After instead of
+queueing until the client times out.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core import metrics as _metrics
+
+logger = logging.getLogger("uvicorn.error")
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))  # 0 = hash inline
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", str(max(PASSWORD_HASH_WORKERS, 1) * 4)))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+BCRYPT_MAX_LENGTH = 72
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+_inflight = 0
+_stats: Dict[str, float] = {
+    "submitted": 0,
+    "completed": 0,
+    "rejected": 0,
+    "queue_wait_seconds_total": 0.0,
+    "queue_wait_seconds_max": 0.0,
+    "hash_seconds_total": 0.0,
+    "hash_seconds_max": 0.0,
+}
+
+_worker_ctx = None
+
+
+# ---- worker side ----
+def _crypt_context():
+    global _worker_ctx
+    if _worker_ctx is None:
+        from passlib.context import CryptContext
+        _worker_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _worker_ctx
+
+
+def _run(op: str, plain: str, hashed: Optional[str] = None) -> Tuple[object, float, float]:
+    started = time.time()
+    if op == "hash":
+        result = _crypt_context().hash(plain[:BCRYPT_MAX_LENGTH])
+    else:
+        try:
+            result = _crypt_context().verify(plain[:BCRYPT_MAX_LENGTH], hashed)
+        except Exception:
+            result = False
+    return result, started, time.time()
+
+
+# ---- pool management ----
+def _start_locked() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: the server process is multi-threaded, forking it is not safe
+        _pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"password hasher started with {PASSWORD_HASH_WORKERS} workers")
+    return _pool
+
+
+def _discard_locked(pool: ProcessPoolExecutor) -> None:
+    """Drop `pool` if it is still the current one; the next submit starts a new pool."""
+    global _pool
+    if _pool is pool:
+        _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def start() -> None:
+    """Create the pool up front (called from the app lifespan) so the first login doesn't pay for it."""
+    if PASSWORD_HASH_WORKERS <= 0:
+        return
+    with _lock:
+        _start_locked()
+
+
+def shutdown() -> None:
+    with _lock:
+        if _pool is not None:
+            _discard_locked(_pool)
+
+
+def get_stats() -> Dict[str, float]:
+    with _lock:
+        stats = dict(_stats)
+        stats["inflight"] = _inflight
+    return stats
+
+
+def _record(op: str, submitted_at: float, started: float, finished: float) -> None:
+    queue_wait = max(started - submitted_at, 0.0)
+    hash_time = finished - started
+    _metrics.BCRYPT_SECONDS.observe(hash_time, op)
+    _metrics.BCRYPT_QUEUE_WAIT_SECONDS.observe(queue_wait, op)
+    with _lock:
+        _stats["completed"] += 1
+        _stats["queue_wait_seconds_total"] += queue_wait
+        _stats["queue_wait_seconds_max"] = max(_stats["queue_wait_seconds_max"], queue_wait)
+        _stats["hash_seconds_total"] += hash_time
+        _stats["hash_seconds_max"] = max(_stats["hash_seconds_max"], hash_time)
+
+
+def _release(pool: ProcessPoolExecutor, future: Future) -> None:
+    global _inflight
+    with _lock:
+        _inflight -= 1
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # a worker died (e.g. OOM-killed); every later submit to this pool would fail
+            logger.error("password hasher worker died, restarting the pool")
+            _discard_locked(pool)
+
+
+def _submit(op: str, plain: str, hashed: Optional[str] = None) -> Future:
+    global _inflight
+    with _lock:
+        if _inflight >= PASSWORD_HASH_QUEUE_LIMIT:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+            )
+        pool = _start_locked()
+        try:
+            future = pool.submit(_run, op, plain, hashed)
+        except BrokenProcessPool:
+            # broken before a result told us: retry once on a fresh pool
+            logger.error("password hasher pool is broken, restarting it")
+            _discard_locked(pool)
+            pool = _start_locked()
+            future = pool.submit(_run, op, plain, hashed)
+        # counted only once submitted, so a failed submit can't leak a slot
+        _inflight += 1
+        _stats["submitted"] += 1
+    # outside the lock: the callback runs right away if the future is already done
+    future.add_done_callback(functools.partial(_release, pool))
+    return future
+
+
+def _unwrap(op: str, submitted_at: float, outcome: Tuple[object, float, float]):
+    result, started, finished = outcome
+    _record(op, submitted_at, started, finished)
+    return result
+
+
+# ---- public API ----
+async def hash_password(plain: str) -> str:
+    if PASSWORD_HASH_WORKERS <= 0:
+        from starlette.concurrency import run_in_threadpool
+        return await run_in_threadpool(hash_password_sync, plain)
+    submitted_at = time.time()
+    outcome = await asyncio.wrap_future(_submit("hash", plain))
+    return _unwrap("hash", submitted_at, outcome)
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    if PASSWORD_HASH_WORKERS <= 0:
+        from starlette.concurrency import run_in_threadpool
+        return await run_in_threadpool(verify_password_sync, plain, hashed)
+    submitted_at = time.time()
+    outcome = await asyncio.wrap_future(_submit("verify", plain, hashed))
+    return _unwrap("verify", submitted_at, outcome)
+
+
+def hash_password_sync(plain: str) -> str:
+    """Blocking variant for the threadpool (sync) routes; the CPU work still runs in the pool."""
+    submitted_at = time.time()
+    if PASSWORD_HASH_WORKERS <= 0:
+        return _unwrap("hash", submitted_at, _run("hash", plain))
+    return _unwrap("hash", submitted_at, _submit("hash", plain).result())
+
+
+def verify_password_sync(plain: str, hashed: str) -> bool:
+    submitted_at = time.time()
+    if PASSWORD_HASH_WORKERS <= 0:
+        return _unwrap("verify", submitted_at, _run("verify", plain, hashed))
+    return _unwrap("verify", submitted_at, _submit("verify", plain, hashed).result())
@@ -0,0 +1,99 @@
+# app/Shared/permissions.py
+"""
+In-memory role/resource permission matrix.
+
+get_module_permission used to run a Permission JOIN Resource query on every
+staff request to read one access_type. The whole (role_id, resource name) ->
+access_type matrix is small, so it's loaded in one query and kept in a dict.
+It's reloaded when older than PERMISSION_CACHE_TTL_SECONDS, or on the next
+lookup after invalidate() (call it after editing roles/permissions). Reloads
+happen on one thread while the others keep serving the previous matrix.
+Hit rate and refresh cost are exported on /api/metrics (permission_*).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import app.core.db.session as _database
+from app.core import metrics as _metrics
+from app.user.models import Permission, Resource
+
+logger = logging.getLogger("uvicorn.error")
+
+PERMISSION_CACHE_TTL_SECONDS = float(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "60"))
+
+
+class PermissionMatrix:
+    def __init__(self, ttl_seconds: float = PERMISSION_CACHE_TTL_SECONDS, session_factory=None):
+        self.ttl_seconds = ttl_seconds
+        self._session_factory = session_factory or _database.SessionLocal
+        self._matrix: Optional[Dict[Tuple[int, str], str]] = None
+        self._loaded_at = 0.0
+        self._loaded_version = -1
+        self._version = 0
+        self._reload_lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Bump the version; the next lookup reloads the matrix."""
+        self._version += 1
+
+    def _stale(self) -> bool:
+        return (
+            self._matrix is None
+            or self._loaded_version != self._version
+            or time.monotonic() - self._loaded_at > self.ttl_seconds
+        )
+
+    def _load(self) -> None:
+        version = self._version
+        started = time.perf_counter()
+        db = self._session_factory()
+        try:
+            rows = (
+                db.query(Permission.role_id, Resource.name, Permission.access_type)
+                .join(Resource, Resource.id == Permission.resource_id)
+                .all()
+            )
+        finally:
+            db.close()
+        self._matrix = {(role_id, name): access_type for role_id, name, access_type in rows}
+        self._loaded_at = time.monotonic()
+        self._loaded_version = version
+        elapsed = time.perf_counter() - started
+        _metrics.PERMISSION_REFRESH_SECONDS.observe(elapsed)
+        logger.debug(f"permission matrix loaded: {len(rows)} entries in {elapsed * 1000:.1f} ms")
+
+    def _refresh(self) -> bool:
+        """Reload if stale; returns True if the caller had to wait for it."""
+        if self._matrix is None:
+            # nothing to serve yet: everyone waits for the first load
+            with self._reload_lock:
+                if self._matrix is None:
+                    self._load()
+            return True
+        if self._reload_lock.acquire(blocking=False):
+            try:
+                if self._stale():
+                    self._load()
+            except Exception as e:
+                _metrics.PERMISSION_REFRESH_ERRORS_TOTAL.inc()
+                logger.error(f"permission matrix reload failed, serving previous one: {e}")
+            finally:
+                self._reload_lock.release()
+        return False
+
+    def access_type(self, role_id: Optional[int], resource: str) -> Optional[str]:
+        """access_type of `role_id` on `resource`, None if no permission row exists."""
+        waited = self._refresh() if self._stale() else False
+        # hit: answered from memory; miss: had to wait for a load
+        _metrics.PERMISSION_LOOKUPS_TOTAL.inc(1, "miss" if waited else "hit")
+        return self._matrix.get((role_id, resource))
+
+    def entries(self) -> int:
+        return len(self._matrix or {})
+
+
+permission_matrix = PermissionMatrix()
+_metrics.register_collector(lambda: _metrics.PERMISSION_MATRIX_ENTRIES.set(permission_matrix.entries()))
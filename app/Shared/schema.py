@@ -1,5 +1,5 @@
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr, Field
+from typing import Generic, Optional, List, TypeVar
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from datetime import datetime
 
 
@@ -84,8 +84,37 @@ class UserOut(BaseModel):
     is_verified: Optional[bool] = False
     created_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CountryOut(BaseModel):
+    id: int
+    country: str
+    country_code: Optional[str] = None
+
+
+class SourceOut(BaseModel):
+    id: int
+    source: str
+
+
+class LookupOut(BaseModel):
+    id: int
+    name: str
+
+
+class PaginationOptions(BaseModel):
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    cursor: Optional[str] = None
+
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
 
 
 class AuthLoginResp(BaseModel):
@@ -0,0 +1,217 @@
+# app/Shared/smtp_pool.py
+"""
+Reusable SMTP sessions.
+
+Opening a session costs a TCP connect, STARTTLS and AUTH, which dwarfs the
+cost of sending one OTP email. The pool keeps authenticated sessions around,
+checks them with NOOP after they've been idle for a while, reconnects on
+failure, caps concurrent sessions, and can push several messages through one
+session (send_many).
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    import smtplib
+
+from app.core import metrics as _metrics
+
+logger = logging.getLogger("uvicorn.error")
+
+Message = Tuple[str, Union[str, Sequence[str]], str]  # (from_addr, to_addrs, message)
+
+
+class _Session:
+    def __init__(self, smtp: "smtplib.SMTP"):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        max_sessions: int = 4,
+        noop_after_seconds: float = 30,
+        max_idle_seconds: float = 240,
+        max_messages_per_session: int = 100,
+        starttls: bool = True,
+        timeout: float = 10,
+    ):
+        """
+        :param max_sessions: cap on concurrently open sessions; callers beyond it wait.
+        :param noop_after_seconds: sessions idle longer than this are checked with NOOP before reuse.
+        :param max_idle_seconds: sessions idle longer than this are closed instead of reused
+            (servers drop them anyway).
+        :param max_messages_per_session: recycle a session after this many messages.
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.noop_after_seconds = noop_after_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self.max_messages_per_session = max_messages_per_session
+        self.starttls = starttls
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._idle: List[_Session] = []
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "reuses": 0, "noop_failures": 0, "discarded": 0, "messages": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _connect(self) -> _Session:
+        # imported on first use: smtplib pulls in ssl and the email package, which
+        # an instance that never sends mail (or only queues it) shouldn't load
+        import smtplib
+
+        started = time.perf_counter()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            # TLS or auth failure: don't leak the socket (send() retries, which would double it)
+            smtp.close()
+            raise
+        _metrics.SMTP_CONNECT_SECONDS.observe(time.perf_counter() - started)
+        self._count("connects")
+        return _Session(smtp)
+
+    @staticmethod
+    def _close(session: _Session) -> None:
+        try:
+            session.smtp.quit()
+        except Exception:
+            try:
+                session.smtp.close()
+            except Exception:
+                pass
+
+    def _checkout(self) -> _Session:
+        import smtplib
+
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                return self._connect()
+            idle = time.monotonic() - session.last_used
+            if idle > self.max_idle_seconds:
+                self._close(session)
+                continue
+            if idle > self.noop_after_seconds:
+                try:
+                    if session.smtp.noop()[0] != 250:
+                        raise smtplib.SMTPException("NOOP rejected")
+                except Exception:
+                    self._count("noop_failures")
+                    self._close(session)
+                    continue
+            self._count("reuses")
+            return session
+
+    def _checkin(self, session: _Session) -> None:
+        session.last_used = time.monotonic()
+        if session.messages_sent >= self.max_messages_per_session:
+            self._close(session)
+            return
+        with self._lock:
+            self._idle.append(session)
+
+    @contextmanager
+    def session(self) -> Iterator[_Session]:
+        """Borrow a session; it's discarded instead of returned if the block raises, unless
+        the server merely rejected a message (smtplib has already RSET the session)."""
+        import smtplib
+
+        with self._slots:
+            session = self._checkout()
+            try:
+                yield session
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                self._checkin(session)
+                raise
+            except Exception:
+                self._count("discarded")
+                self._close(session)
+                raise
+            self._checkin(session)
+
+    def send(self, from_addr: str, to_addrs: Union[str, Sequence[str]], message: str) -> None:
+        """
+        Send one message, retrying once on a fresh session if the pooled one was dropped.
+        A rejection (refused recipient or sender, bad data, failed auth) raises right away.
+        """
+        import smtplib
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            for attempt in range(2):
+                try:
+                    with self.session() as session:
+                        session.smtp.sendmail(from_addr, to_addrs, message)
+                        session.messages_sent += 1
+                        self._count("messages")
+                    outcome = "sent"
+                    return
+                # SMTPException is an OSError too, so OSError would also retry rejections
+                except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                    if attempt:
+                        raise
+        finally:
+            _metrics.SMTP_SEND_SECONDS.observe(time.perf_counter() - started, outcome)
+
+    def send_many(self, messages: Iterable[Message]) -> List[bool]:
+        """Send several messages over one session; one failed recipient doesn't abort the batch."""
+        import smtplib
+
+        results = []
+        with self.session() as session:
+            for from_addr, to_addrs, message in messages:
+                try:
+                    session.smtp.sendmail(from_addr, to_addrs, message)
+                    session.messages_sent += 1
+                    self._count("messages")
+                    results.append(True)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                    logger.error(f"smtp batch: message rejected: {e}")
+                    session.smtp.rset()
+                    results.append(False)
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._close(session)
+
+
+class AsyncSMTPConnectionPool:
+    """Event-loop facade: the blocking smtplib calls run in the default executor."""
+
+    def __init__(self, pool: SMTPConnectionPool):
+        self.pool = pool
+
+    async def send(self, from_addr: str, to_addrs: Union[str, Sequence[str]], message: str) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.send, from_addr, to_addrs, message)
+
+    async def send_many(self, messages: Iterable[Message]) -> List[bool]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.pool.send_many, list(messages))
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
@@ -0,0 +1,101 @@
+# app/Shared/token_cache.py
+"""
+Bounded LRU cache of verified JWT payloads.
+
+Clients poll with the same bearer token thousands of times; once a token's
+signature has been checked the payload is kept (keyed by the SHA-256 of the
+token, never the token itself) until the token expires, so HS256 is not
+recomputed on every request. The `kid` that signed it is kept alongside, so a
+hit can be refused once that key is retired.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class TokenCache:
+    def __init__(self, maxsize: int = 10000, token_max_age: Optional[int] = None):
+        """
+        :param maxsize: max number of cached payloads, least recently used are evicted first.
+        :param token_max_age: seconds a token stays valid after its `token_time` claim
+            (JWT_EXPIRY), on top of the standard `exp` claim.
+        """
+        self.maxsize = maxsize
+        self.token_max_age = token_max_age
+        # sha256(token) -> (expires_at, kid, payload)
+        self._entries: "OrderedDict[bytes, Tuple[float, Optional[str], Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def expires_at(self, payload: Dict[str, Any]) -> Optional[float]:
+        """Earliest of `exp` and `token_time + token_max_age`; None if the token never expires."""
+        deadlines = []
+        if payload.get("exp") is not None:
+            deadlines.append(float(payload["exp"]))
+        if self.token_max_age is not None and payload.get("token_time") is not None:
+            deadlines.append(float(payload["token_time"]) + self.token_max_age)
+        return min(deadlines) if deadlines else None
+
+    def get(self, token: str, accepts: Optional[Callable[[Optional[str]], bool]] = None) -> Optional[Dict[str, Any]]:
+        """
+        :param accepts: called with the cached `kid` (None for HS256); a False return
+            drops the entry and counts as a miss, so the token is verified again.
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, kid, payload = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if accepts is not None and not accepts(kid):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, token: str, payload: Dict[str, Any], kid: Optional[str] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = self.expires_at(payload)
+        # tokens without an expiry are never cached, they'd pin the entry forever
+        if expires_at is None or expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, kid, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,121 @@
+# app/Shared/token_claims.py
+"""
+Claims carried by access tokens, and the revocation epochs that void them.
+
+Access tokens used to carry only `sub`, so anything that needed to know who
+the caller is (get_module_permission reads user_type and role_id) had to go
+back to the user table. Tokens issued at login/refresh now carry CLAIMS,
+taken from the user row at issue time, and authorization reads them from the
+verified payload:
+
+    user_type       "user" | "staff"
+    role_id         staff role for the permission matrix, None for users
+    plan_type_id
+    account_status  "active" | "suspended" | "deleted"
+    ver             User.token_version when the token was issued
+
+Claims are a snapshot: a role or status change only shows up in tokens
+issued afterwards. To void the tokens already out there, bump the user's
+token_version (service.revoke_user_tokens). A token is rejected when its
+`ver` is below its user's current version. Few users ever get bumped, so
+the versions above 0 are loaded into one dict in one query and served from
+memory, reloaded when older than REVOCATION_CACHE_TTL_SECONDS or on the next
+check after invalidate(). A revocation made by another process is honoured
+within one TTL.
+"""
+import logging
+import os
+import threading
+import time
+from enum import Enum
+from typing import Any, Dict, Optional
+
+import sqlalchemy as _sql
+
+import app.core.db.session as _database
+from app.user.models import User
+
+logger = logging.getLogger("uvicorn.error")
+
+REVOCATION_CACHE_TTL_SECONDS = float(os.getenv("REVOCATION_CACHE_TTL_SECONDS", "30"))
+
+CLAIMS = ("user_type", "role_id", "plan_type_id", "account_status", "ver")
+
+
+def claims_for(user: User) -> Dict[str, Any]:
+    """The CLAIMS of `user` as they go into a token."""
+    status = user.account_status
+    return {
+        "user_type": user.user_type or "user",
+        "role_id": user.role_id,
+        "plan_type_id": user.plan_type_id,
+        "account_status": status.value if isinstance(status, Enum) else (status or "active"),
+        "ver": user.token_version or 0,
+    }
+
+
+class RevocationEpochs:
+    def __init__(self, ttl_seconds: float = REVOCATION_CACHE_TTL_SECONDS, session_factory=None):
+        self.ttl_seconds = ttl_seconds
+        self._session_factory = session_factory or _database.SessionLocal
+        self._versions: Optional[Dict[int, int]] = None
+        self._loaded_at = 0.0
+        self._loaded_generation = -1
+        self._generation = 0
+        self._reload_lock = threading.Lock()
+        self.stats = {"refreshes": 0, "refresh_errors": 0, "rejected": 0}
+
+    def invalidate(self) -> None:
+        """The next check reloads the versions (call after bumping a token_version)."""
+        self._generation += 1
+
+    def stale(self) -> bool:
+        return (
+            self._versions is None
+            or self._loaded_generation != self._generation
+            or time.monotonic() - self._loaded_at > self.ttl_seconds
+        )
+
+    def _load(self) -> None:
+        generation = self._generation
+        db = self._session_factory()
+        try:
+            rows = db.execute(_sql.select(User.id, User.token_version).where(User.token_version > 0)).all()
+        finally:
+            db.close()
+        self._versions = {user_id: version for user_id, version in rows}
+        self._loaded_at = time.monotonic()
+        self._loaded_generation = generation
+        self.stats["refreshes"] += 1
+
+    def refresh(self) -> None:
+        """Reload if stale. Blocking (it queries); everyone waits only for the first load."""
+        if self._versions is None:
+            with self._reload_lock:
+                if self._versions is None:
+                    self._load()
+            return
+        if self._reload_lock.acquire(blocking=False):
+            try:
+                if self.stale():
+                    self._load()
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                logger.error(f"revocation epochs reload failed, serving previous ones: {e}")
+            finally:
+                self._reload_lock.release()
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        """True if the token's `ver` is below its user's token_version. Memory only, call refresh() first."""
+        try:
+            user_id = int(payload.get("sub"))
+        except (TypeError, ValueError):
+            return True
+        current = (self._versions or {}).get(user_id, 0)
+        if payload.get("ver", 0) < current:
+            self.stats["rejected"] += 1
+            return True
+        return False
+
+
+revocations = RevocationEpochs()
@@ -0,0 +1,184 @@
+# app/core/async_router.py
+# Event-loop version of app.core.main_router, served instead of it when DB_MODE=async.
+from typing import List, Optional
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+import app.Shared.helpers as _helpers
+from app.Shared import schema as _schemas
+from app.Shared import email_queue as _email_queue
+from app.Shared import signing_keys as _signing_keys
+from app.user import async_service as _services
+from app.user import reference_data as _reference_data
+from app.core import lockout as _lockout
+from app.core import metrics as _metrics
+from app.core import query_inspector as _query_inspector
+from app.core import responses as _responses
+
+logger = logging.getLogger("uvicorn.error")
+router = APIRouter(prefix="/api")
+
+# register/login/google: validated once from the ORM user and written as JSON by pydantic-core
+auth_response = _responses.Serializer(_schemas.AuthLoginResp)
+
+
+@router.get("/healthcheck", status_code=200)
+async def healthcheck():
+    return {"status": "healthy"}
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(_metrics.require_metrics_token)],
+)
+async def metrics():
+    return PlainTextResponse(_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks():
+    # public keys for services that verify our tokens themselves; serialized once per key change
+    return Response(
+        _signing_keys.get_key_ring().jwks_json(),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={_signing_keys.JWKS_MAX_AGE_SECONDS}"},
+    )
+
+
+@router.get("/debug/queries", include_in_schema=False, dependencies=[Depends(_metrics.require_metrics_token)])
+async def debug_queries(reset: bool = False):
+    if not _query_inspector.QUERY_INSPECTOR_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    snapshot = _query_inspector.report.snapshot()
+    if reset:
+        _query_inspector.report.clear()
+    return snapshot
+
+
+@router.post("/auth/check-email", response_model=_schemas.ExistsResp, tags=["Auth"])
+async def check_email(payload: _schemas.CheckEmailReq, db: AsyncSession = Depends(_services.get_read_db)):
+    if not _helpers.validate_email(payload.email):
+        raise HTTPException(status_code=400, detail="Incorrect email format")
+    exists = await _services.check_email_exists(db, payload.email)
+    return {"exists": exists}
+
+
+@router.post("/auth/send-otp", tags=["Auth"])
+async def send_otp(payload: _schemas.SendOtpReq, db: AsyncSession = Depends(_services.get_db)):
+    if not _helpers.validate_email(payload.email):
+        raise HTTPException(status_code=400, detail="Incorrect email format")
+
+    otp = _helpers.create_otp()
+    subject = "OTP from your application"
+    html_text = f"Thank you for choosing <strong>Link Nest</strong>. Use the following OTP to complete your sign-up procedure. This OTP is valid for <strong>5 minutes</strong>."
+
+    # store first so the OTP is valid by the time the queued email arrives
+    await _services.save_otp(db, payload.email, otp, purpose="verify")
+    await _email_queue.aenqueue_email(payload.email, subject, html_text, otp)
+    return JSONResponse(content={"message": "OTP sent"}, status_code=200)
+
+
+@router.post("/auth/verify-otp", tags=["Auth"])
+async def verify_otp(payload: _schemas.VerifyOtpReq, db: AsyncSession = Depends(_services.get_db)):
+    if not _helpers.validate_email(payload.email):
+        raise HTTPException(status_code=400, detail="Incorrect email format")
+    ok = await _services.verify_otp(db, payload.email, payload.otp, purpose="verify")
+    if not ok:
+        raise HTTPException(status_code=400, detail="Invalid or expired OTP")
+    return {"message": "OTP verified successfully"}
+
+
+@router.post("/auth/forgot-password", tags=["Auth"])
+async def forgot_password(payload: _schemas.ForgotPasswordReq, db: AsyncSession = Depends(_services.get_db)):
+    if not _helpers.validate_email(payload.email):
+        raise HTTPException(status_code=400, detail="Incorrect email format")
+    if not await _services.get_user_by_email(db, payload.email):
+        raise HTTPException(status_code=404, detail="Email not found")
+    otp = _helpers.create_otp()
+    subject = "Password reset OTP"
+    html_text = f"You requested to reset your password for <strong>Link Nest</strong>. Use the following OTP to complete your password reset. This OTP is valid for <strong>5 minutes</strong>."
+    await _services.save_otp(db, payload.email, otp, purpose="reset")
+    await _email_queue.aenqueue_email(payload.email, subject, html_text, otp)
+    return {"message": "OTP sent for password reset"}
+
+
+@router.post("/auth/reset-password", tags=["Auth"])
+async def reset_password(payload: _schemas.ResetPasswordReq, db: AsyncSession = Depends(_services.get_db)):
+    if not _helpers.validate_email(payload.email):
+        raise HTTPException(status_code=400, detail="Incorrect email format")
+    await _services.reset_password_using_otp(db, payload.email, payload.otp, payload.new_password)
+    return {"message": "Password reset successful"}
+
+
+@router.post("/auth/register", response_model=_schemas.AuthLoginResp, tags=["Auth"])
+async def register(payload: _schemas.RegisterReq, db: AsyncSession = Depends(_services.get_db)):
+    user, access_token, refresh_token = await _services.register_user(db, payload)
+    return auth_response.response({"message": "User registered", "access_token": access_token, "refresh_token": refresh_token, "user": user})
+
+
+@router.post("/auth/login", response_model=_schemas.AuthLoginResp, tags=["Auth"])
+async def login(payload: _schemas.LoginReq, db: AsyncSession = Depends(_services.get_db)):
+    # lockout check
+    lockout = _lockout.get_store()
+    if await lockout.alocked_for(payload.email):
+        raise HTTPException(status_code=403, detail="Account locked due to multiple failed attempts")
+
+    try:
+        user, access_token, refresh_token = await _services.login_with_email(db, payload.email, payload.password)
+        # reset attempts on success
+        await lockout.areset(payload.email)
+        return auth_response.response({"message": "Login successful", "access_token": access_token, "refresh_token": refresh_token, "user": user})
+    except HTTPException as e:
+        if e.status_code == 503:
+            # hasher is shedding load; not a failed attempt
+            raise e
+        await lockout.aregister_failure(payload.email)
+        raise e
+
+
+@router.post("/auth/google", response_model=_schemas.AuthLoginResp, tags=["Auth"])
+async def google_login(payload: _schemas.GoogleLoginReq, db: AsyncSession = Depends(_services.get_db)):
+    user, access_token, refresh_token = await _services.login_with_google(db, payload.id_token)
+    return auth_response.response({"message": "Login successful", "access_token": access_token, "refresh_token": refresh_token, "user": user})
+
+
+@router.post("/auth/refresh", tags=["Auth"])
+async def refresh(payload: _schemas.RefreshReq, db: AsyncSession = Depends(_services.get_db)):
+    try:
+        new_access = await _services.refresh_access_token(db, payload.refresh_token)
+        return {"message": new_access}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+
+@router.post("/auth/logout", tags=["Auth"])
+async def logout(payload: Optional[_schemas.RefreshReq], db: AsyncSession = Depends(_services.get_db)):
+    token = payload.refresh_token if payload else None
+    await _services.logout_user(db, refresh_token=token)
+    return {"message": "Logged out"}
+
+
+@router.get("/countries", response_model=List[_schemas.CountryOut], tags=["Misc"])
+async def read_countries(request: Request):
+    return _reference_data.cache.respond("countries", request, await _reference_data.cache.aget("countries"))
+
+
+@router.get("/sources", response_model=List[_schemas.SourceOut], tags=["Misc"])
+async def read_sources(request: Request):
+    return _reference_data.cache.respond("sources", request, await _reference_data.cache.aget("sources"))
+
+
+@router.get("/plan-types", response_model=List[_schemas.LookupOut], tags=["Misc"])
+async def read_plan_types(request: Request):
+    return _reference_data.cache.respond("plan_types", request, await _reference_data.cache.aget("plan_types"))
+
+
+@router.get("/profile-types", response_model=List[_schemas.LookupOut], tags=["Misc"])
+async def read_profile_types(request: Request):
+    return _reference_data.cache.respond("profile_types", request, await _reference_data.cache.aget("profile_types"))
@@ -0,0 +1,196 @@
+# app/core/config.py
+"""
+Process-wide configuration.
+
+.env is read once, the first time this module is imported; every module
+that reads os.getenv at import time imports it first, so the order in which
+the app modules happen to be imported no longer decides which settings see
+.env. Variables already present in the environment win over the file (on
+Vercel there is no .env and this is a single stat()).
+ENV_FILE overrides the location (default: .env at the project root).
+
+The settings shared across modules (database, JWT, SMTP) are parsed and
+validated once into a frozen Settings, with derived values (signing key,
+expiry timedeltas) computed up front; get_settings() returns it. Tests build
+their own (Settings.from_env({...}) or dataclasses.replace) and install it
+with set_settings(), or override get_settings as a FastAPI dependency.
+Tuning knobs that belong to one subsystem (pool, rate limits, logging, ...)
+stay next to the code they tune.
+"""
+import dataclasses
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import List, Mapping, Optional
+
+logger = logging.getLogger("uvicorn.error")
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+ENV_FILE = os.getenv("ENV_FILE") or str(PROJECT_ROOT / ".env")
+
+_loaded = False
+
+
+def load_env() -> None:
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if os.path.isfile(ENV_FILE):
+        from dotenv import load_dotenv
+
+        load_dotenv(ENV_FILE, override=False)
+
+
+load_env()
+
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver in a DATABASE_URL for its async counterpart."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite:///", "sqlite+aiosqlite:///"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    database_url: Optional[str] = None
+    async_database_url: Optional[str] = None
+    # "sync" keeps the threadpool + SessionLocal path, "async" serves the auth
+    # routes from AsyncSessionLocal on the event loop
+    db_mode: str = "sync"
+
+    jwt_secret: str = ""
+    # JSON list of EdDSA/ES256 signing keys, see app.Shared.signing_keys; empty = HS256 with jwt_secret
+    jwt_keys: str = ""
+    access_token_expire: timedelta = timedelta(minutes=15)
+    refresh_token_expire: timedelta = timedelta(days=7)
+    # max age of tokens carrying a `token_time` claim, None = only `exp` counts
+    jwt_expiry: Optional[timedelta] = None
+    token_cache_size: int = 10000  # 0 disables the decode cache
+    pagination_cursor_secret: str = ""
+
+    sender_email: str = "qamber.qsol@gmail.com"
+    sender_password: str = ""  # SENDER_PASSWORD; no OTP mail goes out without it
+    smtp_server: str = "smtp.gmail.com"
+    smtp_port: int = 587
+    smtp_starttls: bool = True
+    smtp_max_sessions: int = 4
+    smtp_noop_after_seconds: float = 30.0
+
+    auth_base_url: Optional[str] = None
+
+    # derived in __post_init__
+    async_db: bool = dataclasses.field(init=False)
+    signing_key: bytes = dataclasses.field(init=False, repr=False)
+    access_token_expire_seconds: int = dataclasses.field(init=False)
+    refresh_token_expire_seconds: int = dataclasses.field(init=False)
+    jwt_expiry_seconds: Optional[int] = dataclasses.field(init=False)
+
+    def __post_init__(self):
+        errors = []
+        if self.db_mode not in ("sync", "async"):
+            errors.append(f"DB_MODE must be 'sync' or 'async', not '{self.db_mode}'")
+        for name in ("access_token_expire", "refresh_token_expire", "jwt_expiry"):
+            value = getattr(self, name)
+            if value is not None and value.total_seconds() <= 0:
+                errors.append(f"{name} must be positive")
+        if not 0 < self.smtp_port < 65536:
+            errors.append(f"SMTP_PORT out of range: {self.smtp_port}")
+        if self.smtp_max_sessions < 1:
+            errors.append("SMTP_MAX_SESSIONS must be at least 1")
+        if not self.pagination_cursor_secret:
+            # an empty key makes every forged cursor verify
+            errors.append("PAGINATION_CURSOR_SECRET (or JWT_SECRET) must be set to sign pagination cursors")
+        if errors:
+            raise RuntimeError("invalid settings: " + "; ".join(errors))
+
+        set_ = object.__setattr__
+        set_(self, "async_db", self.db_mode == "async")
+        # PyJWT takes the HMAC key as bytes; encode it once instead of per token
+        set_(self, "signing_key", self.jwt_secret.encode())
+        set_(self, "access_token_expire_seconds", int(self.access_token_expire.total_seconds()))
+        set_(self, "refresh_token_expire_seconds", int(self.refresh_token_expire.total_seconds()))
+        set_(self, "jwt_expiry_seconds", int(self.jwt_expiry.total_seconds()) if self.jwt_expiry else None)
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        errors: List[str] = []
+
+        def number(name: str, default, kind=int):
+            raw = environ.get(name, "")
+            if raw.strip() == "":
+                return default
+            try:
+                return kind(raw)
+            except ValueError:
+                errors.append(f"{name} is not a valid {kind.__name__}: {raw!r}")
+                return default
+
+        def flag(name: str, default: bool) -> bool:
+            raw = environ.get(name, "").strip().lower()
+            return default if raw == "" else raw == "true"
+
+        database_url = environ.get("DATABASE_URL") or None
+        jwt_secret = environ.get("JWT_SECRET", "")
+        jwt_expiry = number("JWT_EXPIRY", None)
+        jwt_keys = environ.get("JWT_KEYS", "")
+        if not jwt_keys and environ.get("JWT_KEYS_FILE"):
+            try:
+                with open(environ["JWT_KEYS_FILE"], encoding="utf-8") as f:
+                    jwt_keys = f.read()
+            except OSError as e:
+                errors.append(f"JWT_KEYS_FILE can't be read: {e}")
+        kwargs = dict(
+            database_url=database_url,
+            async_database_url=environ.get("ASYNC_DATABASE_URL") or (to_async_url(database_url) if database_url else None),
+            db_mode=environ.get("DB_MODE", "sync").lower(),
+            jwt_secret=jwt_secret,
+            jwt_keys=jwt_keys,
+            access_token_expire=timedelta(seconds=number("ACCESS_TOKEN_EXPIRE_SECONDS", 900)),
+            refresh_token_expire=timedelta(seconds=number("REFRESH_TOKEN_EXPIRE_SECONDS", 60 * 60 * 24 * 7)),
+            jwt_expiry=timedelta(seconds=jwt_expiry) if jwt_expiry is not None else None,
+            token_cache_size=number("TOKEN_CACHE_SIZE", 10000),
+            pagination_cursor_secret=environ.get("PAGINATION_CURSOR_SECRET") or jwt_secret,
+            sender_email=environ.get("SENDER_EMAIL", cls.sender_email),
+            sender_password=environ.get("SENDER_PASSWORD", ""),
+            smtp_server=environ.get("SMTP_SERVER", cls.smtp_server),
+            smtp_port=number("SMTP_PORT", cls.smtp_port),
+            smtp_starttls=flag("SMTP_STARTTLS", cls.smtp_starttls),
+            smtp_max_sessions=number("SMTP_MAX_SESSIONS", cls.smtp_max_sessions),
+            smtp_noop_after_seconds=number("SMTP_NOOP_AFTER_SECONDS", cls.smtp_noop_after_seconds, float),
+            auth_base_url=environ.get("AUTH_BASE_URL") or None,
+        )
+        if errors:
+            raise RuntimeError("invalid settings: " + "; ".join(errors))
+        settings = cls(**kwargs)
+        if not settings.jwt_secret and not settings.jwt_keys.strip():
+            logger.warning("neither JWT_KEYS nor JWT_SECRET is set; tokens can't be issued or verified")
+        if not settings.sender_password:
+            logger.warning("SENDER_PASSWORD is not set; OTP emails can't be sent")
+        return settings
+
+
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """The process settings, built from the environment on first use."""
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env()
+    return _settings
+
+
+def set_settings(settings: Optional[Settings]) -> None:
+    """Install `settings` (tests); None rebuilds them from the environment on the next get."""
+    global _settings
+    _settings = settings
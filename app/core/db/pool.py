@@ -0,0 +1,146 @@
+# app/core/db/pool.py
+"""
+Connection pool configuration and instrumentation for the engines in session.py.
+
+Profiles (DB_POOL_PROFILE):
+
+* "server"     - long-lived process (uvicorn): a QueuePool sized by DB_POOL_SIZE /
+                 DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE
+* "serverless" - Vercel and other short-lived instances: NullPool, every session
+                 opens and closes its own connection, so frozen instances don't
+                 sit on server slots. Put an external pooler (PgBouncer, Neon/
+                 Supabase pooler) in front and set DB_EXTERNAL_POOLER=true.
+
+Pre-ping (DB_POOL_PRE_PING) decides when a checked-out connection is tested:
+
+* "always" - SQLAlchemy's pool_pre_ping, one round-trip on every checkout
+* "idle"   - only connections idle for DB_POOL_PING_AFTER_IDLE_SECONDS or more
+             (default); the servers we talk to don't drop a connection that was
+             used a moment ago, so a busy pool pays nothing
+* "never"
+
+Checkout time, overflow, timeouts, pings and in-use/idle counts are exported
+through app.core.metrics.
+"""
+import os
+import time
+from typing import Dict
+
+import sqlalchemy as _sql
+from sqlalchemy import exc as _exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.core import metrics as _metrics
+
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "server").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+DB_POOL_PING_AFTER_IDLE_SECONDS = float(os.getenv("DB_POOL_PING_AFTER_IDLE_SECONDS", "30"))
+# PgBouncer in transaction mode can't keep server-side prepared statements
+DB_EXTERNAL_POOLER = os.getenv("DB_EXTERNAL_POOLER", "false").lower() == "true"
+
+
+class _InstrumentedPoolMixin:
+    metrics_label = "primary"
+
+    def connect(self):
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except _exc.TimeoutError:
+            _metrics.DB_POOL_TIMEOUTS_TOTAL.inc(1, self.metrics_label)
+            raise
+        finally:
+            _metrics.DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, self.metrics_label)
+        if self._overflow > overflow_before and self._overflow > 0:
+            _metrics.DB_POOL_OVERFLOW_TOTAL.inc(1, self.metrics_label)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url.startswith("sqlite") and (url.endswith(":memory:") or url.rstrip("/").endswith("sqlite:"))
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, object]:
+    """Keyword arguments for create_engine / create_async_engine for the configured profile."""
+    if DB_POOL_PROFILE == "serverless":
+        options: Dict[str, object] = {"poolclass": NullPool}
+    elif DB_POOL_PROFILE == "server":
+        if _is_sqlite_memory(url):
+            return {}
+        options = {
+            "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING == "always",
+        }
+    else:
+        raise RuntimeError(f"Unknown DB_POOL_PROFILE '{DB_POOL_PROFILE}'")
+    if DB_EXTERNAL_POOLER and "asyncpg" in url:
+        options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return options
+
+
+def _ping_if_idle(label: str):
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < DB_POOL_PING_AFTER_IDLE_SECONDS:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        except Exception:
+            _metrics.DB_POOL_PINGS_TOTAL.inc(1, label, "failed")
+            # the pool discards this connection and retries the checkout with a fresh one
+            raise _exc.DisconnectionError()
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        _metrics.DB_POOL_PINGS_TOTAL.inc(1, label, "ok")
+
+    return checkout
+
+
+def _checkin(dbapi_connection, connection_record):
+    connection_record.info["checked_in_at"] = time.monotonic()
+
+
+def instrument_pool(sync_engine, label: str = "primary") -> None:
+    """Idle pre-ping + pool gauges for `sync_engine` (for an AsyncEngine pass .sync_engine)."""
+    pool = sync_engine.pool
+    if isinstance(pool, _InstrumentedPoolMixin):
+        pool.metrics_label = label
+    if DB_POOL_PRE_PING == "idle" and not isinstance(pool, NullPool):
+        _sql.event.listen(pool, "checkin", _checkin)
+        _sql.event.listen(pool, "checkout", _ping_if_idle(label))
+
+    def collect() -> None:
+        if isinstance(pool, QueuePool):
+            checked_out = pool.checkedout()
+            _metrics.DB_POOL_CONNECTIONS.set(checked_out, label, "in_use")
+            _metrics.DB_POOL_CONNECTIONS.set(pool.checkedin(), label, "idle")
+            _metrics.DB_POOL_CONNECTIONS.set(max(pool.overflow(), 0), label, "overflow")
+
+    _metrics.register_collector(collect)
+
+
+def get_stats(sync_engine) -> Dict[str, object]:
+    pool = sync_engine.pool
+    return {"profile": DB_POOL_PROFILE, "pool": pool.__class__.__name__, "status": pool.status()}
@@ -0,0 +1,213 @@
+# app/core/db/routing.py
+"""
+Read-replica routing for read-only queries.
+
+DATABASE_REPLICA_URLS is a comma-separated list of replicas of DATABASE_URL.
+Sessions from ReadSessionLocal / AsyncReadSessionLocal (service get_read_db)
+send their queries to one of them, round-robin, and fall back to the primary
+when:
+
+* no replica is configured (the default, so nothing changes without the env)
+* the replica can't be connected to; it is then skipped for DB_REPLICA_RETRY_SECONDS
+* the session was pinned with read_your_writes() because the key it reads
+  (an email, a user id) was written on the primary less than
+  DB_REPLICA_STICKY_SECONDS ago; set it above the worst replica lag you see
+
+The recent-writes table is per process, so stickiness only holds for requests
+that land on the worker that did the write. Read sessions refuse to flush.
+"""
+import collections
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+from sqlalchemy import exc as _exc
+
+import app.core.db.session as _database
+from app.core import config as _config
+from app.core import metrics as _metrics
+from app.core import query_inspector as _query_inspector
+from app.core.db import pool as _pool
+
+logger = logging.getLogger("uvicorn.error")
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+DB_REPLICA_STICKY_MAX_KEYS = int(os.getenv("DB_REPLICA_STICKY_MAX_KEYS", "100000"))
+
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping the ones that recently failed to connect."""
+
+    def __init__(self, engines: List[_sql.Engine], retry_seconds: float = DB_REPLICA_RETRY_SECONDS):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self._down_until = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def candidates(self) -> List[_sql.Engine]:
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.engines)
+        ordered = self.engines[start:] + self.engines[:start]
+        return [engine for engine in ordered if self._down_until.get(engine, 0) <= now]
+
+    def mark_down(self, engine: _sql.Engine) -> None:
+        self._down_until[engine] = time.monotonic() + self.retry_seconds
+
+
+class RecentWrites:
+    """key -> monotonic deadline until which reads of that key must go to the primary."""
+
+    def __init__(self, sticky_seconds: float = DB_REPLICA_STICKY_SECONDS, max_keys: int = DB_REPLICA_STICKY_MAX_KEYS):
+        self.sticky_seconds = sticky_seconds
+        self.max_keys = max_keys
+        self._until = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, *keys) -> None:
+        until = time.monotonic() + self.sticky_seconds
+        with self._lock:
+            for key in keys:
+                if key is None:
+                    continue
+                self._until[key] = until
+                self._until.move_to_end(key)
+            # oldest deadlines first, so expired entries are always trimmed first
+            while len(self._until) > self.max_keys:
+                self._until.popitem(last=False)
+
+    def is_recent(self, key) -> bool:
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until > time.monotonic():
+            return True
+        with self._lock:
+            if self._until.get(key) == until:
+                del self._until[key]
+        return False
+
+
+recent_writes = RecentWrites()
+
+
+class RoutingSession(_orm.Session):
+    """
+    Read-only session: the first query picks a replica connection (or the
+    primary), and every later query of the session uses the same one.
+    """
+
+    def __init__(self, primary: Optional[_sql.Engine] = None, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._primary = primary
+        self._replicas = replicas
+        self._replica_connection = None
+        self._pinned = False
+
+    def pin_to_primary(self) -> None:
+        if not self._pinned:
+            self._pinned = True
+            if self._replicas:
+                _metrics.DB_READ_ROUTES_TOTAL.inc(1, "primary", "sticky")
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._pinned:
+            return self._primary
+        if self._replica_connection is None:
+            self._replica_connection = self._connect_replica()
+            if self._replica_connection is None:
+                self._pinned = True
+                return self._primary
+        return self._replica_connection
+
+    def _connect_replica(self):
+        if not self._replicas:
+            return None
+        for engine in self._replicas.candidates():
+            try:
+                connection = engine.connect()
+            except _exc.DBAPIError as e:
+                self._replicas.mark_down(engine)
+                _metrics.DB_READ_ROUTES_TOTAL.inc(1, "primary", "replica_down")
+                logger.warning(f"read replica {engine.url.host or engine.url.database} unavailable, skipping it for {self._replicas.retry_seconds:.0f}s: {e}")
+                continue
+            _metrics.DB_READ_ROUTES_TOTAL.inc(1, "replica", "ok")
+            return connection
+        _metrics.DB_READ_ROUTES_TOTAL.inc(1, "primary", "all_replicas_down")
+        return None
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            if self._replica_connection is not None:
+                self._replica_connection.close()
+                self._replica_connection = None
+            self._pinned = False
+
+
+@_sql.event.listens_for(RoutingSession, "before_flush")
+def _refuse_writes(session, flush_context, instances):
+    raise RuntimeError("read session used for a write; use get_db")
+
+
+def read_your_writes(db, *keys) -> None:
+    """Pin `db` to the primary if any of `keys` was written recently. No-op for write sessions."""
+    session = getattr(db, "sync_session", db)
+    if isinstance(session, RoutingSession) and any(recent_writes.is_recent(key) for key in keys):
+        session.pin_to_primary()
+
+
+def _replica_engine(url: str, index: int, is_async: bool = False):
+    label = f"replica{index}" + ("_async" if is_async else "")
+    if is_async:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        engine = create_async_engine(url, echo=_database.SQL_ECHO, **_pool.engine_options(url, is_async=True))
+        sync_engine = engine.sync_engine
+    else:
+        engine = sync_engine = _sql.create_engine(url, echo=_database.SQL_ECHO, **_pool.engine_options(url))
+    _database.enable_sql_sampling(sync_engine)
+    _metrics.instrument_engine(sync_engine)
+    _query_inspector.instrument_engine(sync_engine)
+    _pool.instrument_pool(sync_engine, label=label)
+    return engine
+
+
+replica_engines = [_replica_engine(url, index) for index, url in enumerate(DATABASE_REPLICA_URLS)]
+
+ReadSessionLocal = _orm.sessionmaker(
+    class_=RoutingSession,
+    primary=_database.engine,
+    replicas=ReplicaSet(replica_engines),
+    autoflush=False,
+)
+
+async_replica_engines = []
+AsyncReadSessionLocal = None
+
+if _database.ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_replica_engines = [
+        _replica_engine(_config.to_async_url(url), index, is_async=True)
+        for index, url in enumerate(DATABASE_REPLICA_URLS)
+    ]
+    AsyncReadSessionLocal = async_sessionmaker(
+        sync_session_class=RoutingSession,
+        primary=_database.async_engine.sync_engine,
+        replicas=ReplicaSet([engine.sync_engine for engine in async_replica_engines]),
+        autoflush=False,
+        expire_on_commit=False,
+    )
@@ -1,24 +1,84 @@
+import logging
 import os
+import random
 import sqlalchemy as _sql
 import sqlalchemy.orm as _orm
 import sqlalchemy.ext.declarative as _declarative
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.core import config as _config
+from app.core import metrics as _metrics
+from app.core.db import pool as _pool
+from app.core import query_inspector as _query_inspector
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+settings = _config.get_settings()
+DATABASE_URL = settings.database_url
 
+# "sync" keeps the threadpool + SessionLocal path, "async" serves the auth
+# routes from AsyncSessionLocal on the event loop (needs an async driver, e.g. asyncpg)
+DB_MODE = settings.db_mode
+ASYNC_DB = settings.async_db
+ASYNC_DATABASE_URL = settings.async_database_url
+
+
+# SQL_ECHO logs every statement synchronously through SQLAlchemy (debugging only);
+# SQL_ECHO_SAMPLE_RATE logs that fraction of statements through the app logger instead
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+SQL_ECHO_SAMPLE_RATE = float(os.getenv("SQL_ECHO_SAMPLE_RATE", "0"))
+
+logger = logging.getLogger("uvicorn.error")
+
+# pool size/overflow/timeout/recycle and pre-ping policy come from DB_POOL_* (see app.core.db.pool)
 engine = _sql.create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=True  # turn off in production
+    echo=SQL_ECHO,
+    **_pool.engine_options(DATABASE_URL),
 )
 
+
+def _log_sampled_statement(conn, cursor, statement, parameters, context, executemany):
+    if random.random() < SQL_ECHO_SAMPLE_RATE:
+        # %-style args, so the message is only built if a handler takes it
+        logger.info("sql: %s | params: %r", statement, parameters)
+
+
+def enable_sql_sampling(sync_engine) -> None:
+    if SQL_ECHO_SAMPLE_RATE > 0:
+        _sql.event.listen(sync_engine, "before_cursor_execute", _log_sampled_statement)
+
+
+enable_sql_sampling(engine)
+_metrics.instrument_engine(engine)
+_query_inspector.instrument_engine(engine)
+_pool.instrument_pool(engine)
+
 SessionLocal = _orm.sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+async_engine = None
+AsyncSessionLocal = None
+
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=SQL_ECHO,
+        **_pool.engine_options(ASYNC_DATABASE_URL, is_async=True),
+    )
+    enable_sql_sampling(async_engine.sync_engine)
+    _metrics.instrument_engine(async_engine.sync_engine)
+    _query_inspector.instrument_engine(async_engine.sync_engine)
+    _pool.instrument_pool(async_engine.sync_engine, label="primary_async")
+
+    # expire_on_commit=False: routes serialize ORM objects after the commit,
+    # and lazy refreshes are not allowed outside the greenlet
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
 Base = _declarative.declarative_base()
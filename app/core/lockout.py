@@ -0,0 +1,199 @@
+# app/core/lockout.py
+"""
+Failed-login counting and account lockout.
+
+After LOCKOUT_THRESHOLD failures inside LOCKOUT_WINDOW_SECONDS an email is
+locked for LOCKOUT_DURATION_SECONDS. State is O(1) per key and expires on its
+own, so an attacker spraying random emails can't grow it without bound.
+
+Backends (LOCKOUT_STORE):
+
+* "memory" - per-process, capped at LOCKOUT_MAX_ENTRIES; live locks are never evicted
+* "redis"  - shared across workers/instances, atomic increment-with-expiry
+"""
+import abc
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+LOCKOUT_STORE = os.getenv("LOCKOUT_STORE", "memory").lower()
+LOCKOUT_STORE_URL = os.getenv("LOCKOUT_STORE_URL", "redis://localhost:6379/0")
+LOCKOUT_THRESHOLD = int(os.getenv("LOCKOUT_THRESHOLD", "5"))
+LOCKOUT_DURATION_SECONDS = int(os.getenv("LOCKOUT_DURATION_SECONDS", str(30 * 60)))  # 30 minutes
+LOCKOUT_WINDOW_SECONDS = int(os.getenv("LOCKOUT_WINDOW_SECONDS", str(LOCKOUT_DURATION_SECONDS)))
+LOCKOUT_MAX_ENTRIES = int(os.getenv("LOCKOUT_MAX_ENTRIES", "100000"))
+
+
+class LockoutStore(abc.ABC):
+    def __init__(
+        self,
+        threshold: int = LOCKOUT_THRESHOLD,
+        window_seconds: int = LOCKOUT_WINDOW_SECONDS,
+        duration_seconds: int = LOCKOUT_DURATION_SECONDS,
+    ):
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.duration_seconds = duration_seconds
+
+    @staticmethod
+    def _key(identity: str) -> str:
+        return identity.strip().lower()
+
+    @abc.abstractmethod
+    def locked_for(self, identity: str) -> float:
+        """Seconds until the lock on `identity` lifts, 0 if it isn't locked."""
+
+    @abc.abstractmethod
+    def register_failure(self, identity: str) -> bool:
+        """Count a failed attempt; returns True if it locked `identity`."""
+
+    @abc.abstractmethod
+    def reset(self, identity: str) -> None:
+        """Forget the failures of `identity` (successful login)."""
+
+    async def alocked_for(self, identity: str) -> float:
+        return self.locked_for(identity)
+
+    async def aregister_failure(self, identity: str) -> bool:
+        return self.register_failure(identity)
+
+    async def areset(self, identity: str) -> None:
+        self.reset(identity)
+
+
+class MemoryLockoutStore(LockoutStore):
+    """
+    Failure counters are an LRU; live locks are kept apart and are never
+    evicted, so spraying failures over throwaway emails can't push a victim's
+    lock out. The two share `maxsize`: room is made by dropping expired locks,
+    then the least recently used counter. When only live locks are left, a
+    new email isn't tracked until one of them expires.
+    """
+
+    def __init__(self, maxsize: int = LOCKOUT_MAX_ENTRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.maxsize = maxsize
+        # key -> [failures, window_ends_at], least recently failed first
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        # key -> locked_until; the duration is fixed, so this is also expiry order
+        self._locks: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge_locks(self, now: float) -> None:
+        while self._locks and next(iter(self._locks.values())) <= now:
+            self._locks.popitem(last=False)
+
+    def locked_for(self, identity: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            locked_until = self._locks.get(self._key(identity), 0.0)
+            return max(locked_until - now, 0.0)
+
+    def register_failure(self, identity: str) -> bool:
+        key = self._key(identity)
+        now = time.monotonic()
+        with self._lock:
+            self._purge_locks(now)
+            if key in self._locks:
+                return False
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is None and len(self._entries) + len(self._locks) >= self.maxsize:
+                    if not self._entries:
+                        return False
+                    self._entries.popitem(last=False)
+                entry = self._entries[key] = [0, now + self.window_seconds]
+            self._entries.move_to_end(key)
+            entry[0] += 1
+            if entry[0] < self.threshold:
+                return False
+            # the counter becomes a lock: same room, nothing has to go
+            del self._entries[key]
+            self._locks[key] = now + self.duration_seconds
+            return True
+
+    def reset(self, identity: str) -> None:
+        key = self._key(identity)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._locks.pop(key, None)
+
+
+# INCR with the window set on the first failure; at the threshold set the lock key and start over
+_REGISTER_FAILURE_SCRIPT = """
+local failures = redis.call('INCR', KEYS[1])
+if failures == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if failures >= tonumber(ARGV[2]) then
+    redis.call('SET', KEYS[2], '1', 'EX', ARGV[3])
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+
+class RedisLockoutStore(LockoutStore):
+    def __init__(self, url: str = LOCKOUT_STORE_URL, client=None, **kwargs):
+        """`client` takes any redis-py compatible client, e.g. a fakeredis instance in tests."""
+        super().__init__(**kwargs)
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("LOCKOUT_STORE=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self._register_failure = client.register_script(_REGISTER_FAILURE_SCRIPT)
+
+    def _keys(self, identity: str):
+        key = self._key(identity)
+        return f"lockout:failures:{key}", f"lockout:locked:{key}"
+
+    def locked_for(self, identity: str) -> float:
+        ttl_ms = self.client.pttl(self._keys(identity)[1])
+        return ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else 0.0
+
+    def register_failure(self, identity: str) -> bool:
+        return bool(self._register_failure(
+            keys=list(self._keys(identity)),
+            args=[self.window_seconds, self.threshold, self.duration_seconds],
+        ))
+
+    def reset(self, identity: str) -> None:
+        self.client.delete(self._keys(identity)[0])
+
+    async def alocked_for(self, identity: str) -> float:
+        return await run_in_threadpool(self.locked_for, identity)
+
+    async def aregister_failure(self, identity: str) -> bool:
+        return await run_in_threadpool(self.register_failure, identity)
+
+    async def areset(self, identity: str) -> None:
+        await run_in_threadpool(self.reset, identity)
+
+
+_store: Optional[LockoutStore] = None
+
+
+def get_store() -> LockoutStore:
+    global _store
+    if _store is None:
+        if LOCKOUT_STORE == "memory":
+            _store = MemoryLockoutStore()
+        elif LOCKOUT_STORE == "redis":
+            _store = RedisLockoutStore()
+        else:
+            raise RuntimeError(f"Unknown LOCKOUT_STORE '{LOCKOUT_STORE}'")
+    return _store
+
+
+def set_store(store: LockoutStore) -> None:
+    """Swap the backend, e.g. for tests."""
+    global _store
+    _store = store
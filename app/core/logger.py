@@ -1,8 +1,27 @@
+import collections
+import json
 import logging
+import os
 import sys
+import threading
+import traceback
 from pprint import pformat
-from loguru import logger
-from loguru._defaults import LOGURU_FORMAT
+
+# loguru is imported by the functions that need it, so a process that never
+# turns on LOG_PIPELINE doesn't load it
+
+# route uvicorn/app logging through loguru (init_logging) at startup
+LOG_PIPELINE = os.getenv("LOG_PIPELINE", "false").lower() == "true"
+# "text" or "json"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# empty disables the file sink (e.g. on a read-only filesystem)
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+# hand records to a background writer instead of writing on the calling thread
+LOG_ENQUEUE = os.getenv("LOG_ENQUEUE", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# what to do when the queue is full: "drop_new" or "drop_oldest"
+LOG_DROP_POLICY = os.getenv("LOG_DROP_POLICY", "drop_new").lower()
 
 
 class InterceptHandler(logging.Handler):
@@ -12,6 +31,8 @@ class InterceptHandler(logging.Handler):
     """
 
     def emit(self, record: logging.LogRecord):
+        from loguru import logger
+
         # Get corresponding Loguru level if it exists
         try:
             level = logger.level(record.levelname).name
@@ -19,8 +40,8 @@ class InterceptHandler(logging.Handler):
             level = record.levelno
 
         # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
+        frame, depth = sys._getframe(1), 1
+        while frame and frame.f_code.co_filename == logging.__file__:
             frame = frame.f_back
             depth += 1
 
@@ -41,11 +62,12 @@ def format_record(record: dict) -> str:
     >>>         'users': [   {'age': 87, 'is_active': True, 'name': 'Nick'},
     >>>                      {'age': 27, 'is_active': True, 'name': 'Alex'}]}]
     """
+    from loguru._defaults import LOGURU_FORMAT
 
     format_string = LOGURU_FORMAT
     if record["extra"].get("payload") is not None:
         record["extra"]["payload"] = pformat(
-            record["extra"]["payload"], indent=4, compact=True, width=88
+            _resolve(record["extra"]["payload"]), indent=4, compact=True, width=88
         )
         format_string += "\n<level>{extra[payload]}</level>"
 
@@ -53,6 +75,136 @@ def format_record(record: dict) -> str:
     return format_string
 
 
+def _resolve(payload):
+    """Payloads may be passed as a zero-argument callable so building them is deferred too."""
+    return payload() if callable(payload) else payload
+
+
+def _format_exception(record: dict) -> str:
+    exception = record["exception"]
+    if exception is None:
+        return ""
+    return "".join(traceback.format_exception(exception.type, exception.value, exception.traceback))
+
+
+def render_json(record: dict) -> str:
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        "process": record["process"].id,
+        "thread": record["thread"].name,
+    }
+    for key, value in record["extra"].items():
+        entry[key] = _resolve(value) if key == "payload" else value
+    if record["exception"] is not None:
+        entry["exception"] = _format_exception(record)
+    return json.dumps(entry, default=str) + "\n"
+
+
+def render_text(record: dict) -> str:
+    line = (
+        f"{record['time']:%Y-%m-%d %H:%M:%S.%f}"[:-3]
+        + f" | {record['level'].name:<8} | {record['name']}:{record['function']}:{record['line']} - {record['message']}\n"
+    )
+    payload = record["extra"].get("payload")
+    if payload is not None:
+        line += pformat(_resolve(payload), indent=4, compact=True, width=88) + "\n"
+    return line + _format_exception(record)
+
+
+class QueueSink:
+    """
+    Loguru sink that only appends the record to a bounded in-memory queue; a
+    background thread renders it (JSON or text, payloads included) and writes
+    it to the streams in batches. The calling thread never touches the disk.
+
+    When the queue is full, LOG_DROP_POLICY decides whether the new record or
+    the oldest queued one is dropped; drops are counted and reported in the log.
+    """
+
+    def __init__(self, streams, render, maxsize: int = LOG_QUEUE_SIZE, drop_policy: str = LOG_DROP_POLICY, batch_size: int = 256):
+        if drop_policy not in ("drop_new", "drop_oldest"):
+            raise RuntimeError(f"Unknown LOG_DROP_POLICY '{drop_policy}'")
+        self.streams = streams
+        self.render = render
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.batch_size = batch_size
+        self._records = collections.deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self._dropped_reported = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def __call__(self, message) -> None:
+        with self._cond:
+            if len(self._records) >= self.maxsize:
+                self.dropped += 1
+                if self.drop_policy == "drop_new":
+                    return
+                self._records.popleft()
+            self._records.append(message.record)
+            self._cond.notify()
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._records and not self._stopping:
+                self._cond.wait()
+            batch = []
+            while self._records and len(batch) < self.batch_size:
+                batch.append(self._records.popleft())
+            dropped = self.dropped - self._dropped_reported
+            self._dropped_reported = self.dropped
+            return batch, dropped
+
+    def _write(self, batch, dropped: int) -> None:
+        chunks = []
+        for record in batch:
+            try:
+                chunks.append(self.render(record))
+            except Exception as e:
+                chunks.append(f"log record could not be rendered: {e!r}\n")
+        if dropped:
+            chunks.append(f"log queue full: {dropped} record(s) dropped ({self.drop_policy})\n")
+        data = "".join(chunks)
+        for stream in self.streams:
+            try:
+                stream.write(data)
+                stream.flush()
+            except Exception:
+                pass
+        self.written += len(batch)
+
+    def _run(self) -> None:
+        while True:
+            batch, dropped = self._take_batch()
+            if batch or dropped:
+                self._write(batch, dropped)
+            elif self._stopping:
+                return
+
+    def stop(self, timeout: float = 5) -> None:
+        """Flush what's queued and stop the writer (call on shutdown)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"queued": len(self._records), "written": self.written, "dropped": self.dropped}
+
+
+_queue_sink = None
+
+
 def init_logging():
     """
     Replaces logging handlers with a handler for using the custom handler.
@@ -68,7 +220,11 @@ def init_logging():
     INFO:     Waiting for application startup.
     2020-07-25 02:19:21.357 | INFO     | uvicorn.lifespan.on:startup:34 - Application startup complete.
 
+    With LOG_ENQUEUE (default) records go through a QueueSink, rendered as
+    LOG_FORMAT; otherwise the synchronous stdout + LOG_FILE sinks are used.
     """
+    global _queue_sink
+    from loguru import logger
 
     # disable handlers for specific uvicorn loggers
     # to redirect their output to the default uvicorn logger
@@ -85,8 +241,37 @@ def init_logging():
     intercept_handler = InterceptHandler()
     logging.getLogger("uvicorn").handlers = [intercept_handler]
 
-    # set logs output, level and format
-    logger.configure(
-        handlers=[{"sink": sys.stdout, "level": logging.INFO, "format": format_record}]
-    )
-    logger.add("app.log")
\ No newline at end of file
+    if not LOG_ENQUEUE:
+        # set logs output, level and format
+        logger.configure(
+            handlers=[{"sink": sys.stdout, "level": LOG_LEVEL, "format": format_record}]
+        )
+        if LOG_FILE:
+            logger.add(LOG_FILE, level=LOG_LEVEL, serialize=LOG_FORMAT == "json")
+        return
+
+    streams = [sys.stdout]
+    if LOG_FILE:
+        streams.append(open(LOG_FILE, "a", buffering=1 << 16, encoding="utf-8"))
+    stop_logging()
+    _queue_sink = QueueSink(streams, render_json if LOG_FORMAT == "json" else render_text)
+    # the sink formats nothing on the calling thread: it receives message.record and renders it later
+    logger.configure(handlers=[{"sink": _queue_sink, "level": LOG_LEVEL, "format": "{message}", "colorize": False}])
+
+
+def stop_logging() -> None:
+    """Drain the background sink, if there is one; later records go straight to stdout."""
+    global _queue_sink
+    if _queue_sink is not None:
+        from loguru import logger
+
+        logger.configure(handlers=[{"sink": sys.stdout, "level": LOG_LEVEL, "format": format_record}])
+        _queue_sink.stop()
+        for stream in _queue_sink.streams:
+            if stream is not sys.stdout:
+                stream.close()
+        _queue_sink = None
+
+
+def get_stats() -> dict:
+    return _queue_sink.stats() if _queue_sink is not None else {}
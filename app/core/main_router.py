@@ -1,22 +1,37 @@
 # app/user/main_router.py
-from datetime import datetime, timedelta
 from typing import List, Optional
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from sqlalchemy.orm import Session
 import app.Shared.helpers as _helpers
 from app.Shared import schema as _schemas
+from app.Shared import email_queue as _email_queue
+from app.Shared import signing_keys as _signing_keys
 from app.user import service as _services
+from app.user import reference_data as _reference_data
+from app.core import lockout as _lockout
+from app.core import metrics as _metrics
+from app.core import query_inspector as _query_inspector
+from app.core import responses as _responses
+from app.core.rate_limit import Rate, RateLimit
 
 logger = logging.getLogger("uvicorn.error")
 router = APIRouter(prefix="/api")
 
-# simple rate-limited lockout (memory-based) for failed login attempts
-login_attempts = {}
-LOCKOUT_THRESHOLD = 5
-LOCKOUT_DURATION_SECONDS = 30 * 60  # 30 minutes
+# register/login/google: validated once from the ORM user and written as JSON by pydantic-core
+auth_response = _responses.Serializer(_schemas.AuthLoginResp)
+
+# enforced by RateLimitMiddleware (also for the async router, which serves the same paths)
+RATE_LIMITS = {
+    "/api/auth/check-email": RateLimit(per_ip=Rate(60, 60)),
+    "/api/auth/send-otp": RateLimit(per_ip=Rate(10, 60), per_email=Rate(3, 300)),
+    "/api/auth/forgot-password": RateLimit(per_ip=Rate(10, 60), per_email=Rate(3, 300)),
+    "/api/auth/verify-otp": RateLimit(per_ip=Rate(30, 60), per_email=Rate(10, 300)),
+    "/api/auth/login": RateLimit(per_ip=Rate(30, 60), per_email=Rate(10, 60)),
+    "/api/auth/refresh": RateLimit(per_ip=Rate(60, 60)),
+}
 
 
 @router.get("/healthcheck", status_code=200)
@@ -24,8 +39,38 @@ def healthcheck():
     return {"status": "healthy"}
 
 
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(_metrics.require_metrics_token)],
+)
+def metrics():
+    return PlainTextResponse(_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/.well-known/jwks.json", include_in_schema=False)
+def jwks():
+    # public keys for services that verify our tokens themselves; serialized once per key change
+    return Response(
+        _signing_keys.get_key_ring().jwks_json(),
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={_signing_keys.JWKS_MAX_AGE_SECONDS}"},
+    )
+
+
+@router.get("/debug/queries", include_in_schema=False, dependencies=[Depends(_metrics.require_metrics_token)])
+def debug_queries(reset: bool = False):
+    if not _query_inspector.QUERY_INSPECTOR_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    snapshot = _query_inspector.report.snapshot()
+    if reset:
+        _query_inspector.report.clear()
+    return snapshot
+
+
 @router.post("/auth/check-email", response_model=_schemas.ExistsResp, tags=["Auth"])
-def check_email(payload: _schemas.CheckEmailReq, db: Session = Depends(_services.get_db)):
+def check_email(payload: _schemas.CheckEmailReq, db: Session = Depends(_services.get_read_db)):
     if not _helpers.validate_email(payload.email):
         raise HTTPException(status_code=400, detail="Incorrect email format")
     exists = _services.check_email_exists(db, payload.email)
@@ -41,12 +86,9 @@ def send_otp(payload: _schemas.SendOtpReq, db: Session = Depends(_services.get_d
     subject = "OTP from your application"
     html_text = f"Thank you for choosing <strong>Link Nest</strong>. Use the following OTP to complete your sign-up procedure. This OTP is valid for <strong>5 minutes</strong>."
 
-    sent = _helpers.send_email(payload.email, subject, html_text, otp)
-    print(sent)
-    if not sent:
-        raise HTTPException(status_code=500, detail="Failed to send email")
-
+    # store first so the OTP is valid by the time the queued email arrives
     _services.save_otp(db, payload.email, otp, purpose="verify")
+    _email_queue.enqueue_email(payload.email, subject, html_text, otp)
     return JSONResponse(content={"message": "OTP sent"}, status_code=200)
 
 
@@ -69,9 +111,8 @@ def forgot_password(payload: _schemas.ForgotPasswordReq, db: Session = Depends(_
     otp = _helpers.create_otp()
     subject = "Password reset OTP"
     html_text = f"You requested to reset your password for <strong>Link Nest</strong>. Use the following OTP to complete your password reset. This OTP is valid for <strong>5 minutes</strong>."
-    if not _helpers.send_email(payload.email, subject, html_text, otp):
-        raise HTTPException(status_code=500, detail="Failed to send email")
     _services.save_otp(db, payload.email, otp, purpose="reset")
+    _email_queue.enqueue_email(payload.email, subject, html_text, otp)
     return {"message": "OTP sent for password reset"}
 
 
@@ -86,34 +127,33 @@ def reset_password(payload: _schemas.ResetPasswordReq, db: Session = Depends(_se
 @router.post("/auth/register", response_model=_schemas.AuthLoginResp, tags=["Auth"])
 def register(payload: _schemas.RegisterReq, db: Session = Depends(_services.get_db)):
     user, access_token, refresh_token = _services.register_user(db, payload)
-    return {"message": "User registered", "access_token": access_token, "refresh_token": refresh_token, "user": user}
+    return auth_response.response({"message": "User registered", "access_token": access_token, "refresh_token": refresh_token, "user": user})
 
 
 @router.post("/auth/login", response_model=_schemas.AuthLoginResp, tags=["Auth"])
 def login(payload: _schemas.LoginReq, db: Session = Depends(_services.get_db)):
     # lockout check
-    attempts = login_attempts.get(payload.email, {"count": 0, "locked_until": None})
-    if attempts.get("locked_until") and attempts["locked_until"] > datetime.utcnow():
+    lockout = _lockout.get_store()
+    if lockout.locked_for(payload.email):
         raise HTTPException(status_code=403, detail="Account locked due to multiple failed attempts")
 
     try:
         user, access_token, refresh_token = _services.login_with_email(db, payload.email, payload.password)
         # reset attempts on success
-        login_attempts.pop(payload.email, None)
-        return {"message": "Login successful", "access_token": access_token, "refresh_token": refresh_token, "user": user}
+        lockout.reset(payload.email)
+        return auth_response.response({"message": "Login successful", "access_token": access_token, "refresh_token": refresh_token, "user": user})
     except HTTPException as e:
-        # increment attempts
-        attempts = login_attempts.setdefault(payload.email, {"count": 0, "locked_until": None})
-        attempts["count"] += 1
-        if attempts["count"] >= LOCKOUT_THRESHOLD:
-            attempts["locked_until"] = datetime.utcnow() + timedelta(seconds=LOCKOUT_DURATION_SECONDS)
+        if e.status_code == 503:
+            # hasher is shedding load; not a failed attempt
+            raise e
+        lockout.register_failure(payload.email)
         raise e
 
 
 @router.post("/auth/google", response_model=_schemas.AuthLoginResp, tags=["Auth"])
 def google_login(payload: _schemas.GoogleLoginReq, db: Session = Depends(_services.get_db)):
     user, access_token, refresh_token = _services.login_with_google(db, payload.id_token)
-    return {"message": "Login successful", "access_token": access_token, "refresh_token": refresh_token, "user": user}
+    return auth_response.response({"message": "Login successful", "access_token": access_token, "refresh_token": refresh_token, "user": user})
 
 
 @router.post("/auth/refresh", tags=["Auth"])
@@ -134,18 +174,21 @@ def logout(payload: Optional[_schemas.RefreshReq], db: Session = Depends(_servic
     return {"message": "Logged out"}
         
 
-@router.get("/countries", response_model=List[_schemas.UserOut], tags=["Misc"])
-def read_countries(db: Session = Depends(_services.get_db)):
-    countries = _services.get_all_countries(db)
-    if not countries:
-        raise HTTPException(status_code=404, detail="No countries found")
-    # return country list as dictionaries if you prefer; here we will just return raw ORM list (pydantic not configured for Country)
-    return countries
-
-
-@router.get("/sources", tags=["Misc"])
-def read_sources(db: Session = Depends(_services.get_db)):
-    sources = _services.get_all_sources(db)
-    if not sources:
-        raise HTTPException(status_code=404, detail="No sources found")
-    return sources
+@router.get("/countries", response_model=List[_schemas.CountryOut], tags=["Misc"])
+def read_countries(request: Request):
+    return _reference_data.cache.respond("countries", request, _reference_data.cache.get("countries"))
+
+
+@router.get("/sources", response_model=List[_schemas.SourceOut], tags=["Misc"])
+def read_sources(request: Request):
+    return _reference_data.cache.respond("sources", request, _reference_data.cache.get("sources"))
+
+
+@router.get("/plan-types", response_model=List[_schemas.LookupOut], tags=["Misc"])
+def read_plan_types(request: Request):
+    return _reference_data.cache.respond("plan_types", request, _reference_data.cache.get("plan_types"))
+
+
+@router.get("/profile-types", response_model=List[_schemas.LookupOut], tags=["Misc"])
+def read_profile_types(request: Request):
+    return _reference_data.cache.respond("profile_types", request, _reference_data.cache.get("profile_types"))
@@ -0,0 +1,272 @@
+# app/core/metrics.py
+"""
+Request, database, bcrypt and SMTP timings as fixed-bucket histograms,
+exported in the Prometheus text format at /api/metrics.
+
+Cheap enough to leave on: an observation is a bisect over ~12 bucket bounds
+and a few additions under a per-metric lock. Per-request DB time and query
+count are accumulated in a contextvar that the engine cursor events update
+(see instrument_engine), so they work for threadpool routes, async routes
+and the async engine alike. Work outside a request (email worker, retention)
+still lands in the global histograms.
+
+State is per process; scrape every worker, or run one worker per container.
+
+The endpoint is served only when METRICS_TOKEN is set, to scrapers sending
+`Authorization: Bearer <METRICS_TOKEN>` (Prometheus: `authorization.credentials`).
+"""
+import bisect
+import contextvars
+import hmac
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import sqlalchemy as _sql
+from fastapi import HTTPException, Request
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# route latencies, pool state, queue depths: not for the public internet
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float, int]]:
+        with self._lock:
+            return {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in values)
+        return lines
+
+
+class Gauge:
+    """Point-in-time values, refreshed by the collectors right before each render."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in sorted(self._values.items()))
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Wall time per request.", ("method", "route", "status"))
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.", ("route",), QUERY_BUCKETS)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("route",), COUNT_BUCKETS)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Time per SQL statement.", (), QUERY_BUCKETS)
+BCRYPT_SECONDS = Histogram(
+    "bcrypt_seconds", "bcrypt CPU time per operation.", ("op",))
+BCRYPT_QUEUE_WAIT_SECONDS = Histogram(
+    "bcrypt_queue_wait_seconds", "Time a bcrypt job waited for a worker.", ("op",))
+SMTP_SEND_SECONDS = Histogram(
+    "smtp_send_seconds", "Time to send one message, session checkout included.", ("outcome",))
+SMTP_CONNECT_SECONDS = Histogram(
+    "smtp_connect_seconds", "Time to open an SMTP session (connect, STARTTLS, AUTH).")
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time to check a connection out of the pool (wait + connect + ping).", ("engine",), QUERY_BUCKETS)
+DB_POOL_OVERFLOW_TOTAL = Counter(
+    "db_pool_overflow_total", "Connections opened beyond pool_size.", ("engine",))
+DB_POOL_TIMEOUTS_TOTAL = Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after pool_timeout.", ("engine",))
+DB_POOL_PINGS_TOTAL = Counter(
+    "db_pool_pings_total", "Liveness pings on checkout.", ("engine", "outcome"))
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Pooled connections by state.", ("engine", "state"))
+DB_READ_ROUTES_TOTAL = Counter(
+    "db_read_routes_total", "Read sessions by where their queries went and why.", ("target", "reason"))
+
+PERMISSION_LOOKUPS_TOTAL = Counter(
+    "permission_lookups_total", "Permission matrix lookups: hit = served from memory, miss = waited for a load.", ("result",))
+PERMISSION_REFRESH_SECONDS = Histogram(
+    "permission_refresh_seconds", "Time to load the permission matrix.", (), QUERY_BUCKETS)
+PERMISSION_REFRESH_ERRORS_TOTAL = Counter(
+    "permission_refresh_errors_total", "Failed background reloads of the permission matrix.")
+PERMISSION_MATRIX_ENTRIES = Gauge(
+    "permission_matrix_entries", "(role, resource) entries in the permission matrix.")
+RETENTION_ROWS_PURGED_TOTAL = Counter(
+    "retention_rows_purged_total", "Rows deleted by the retention job.", ("table",))
+RETENTION_BATCH_SECONDS = Histogram(
+    "retention_batch_seconds", "Time per retention batch (select, delete, commit).", ("table",))
+RETENTION_LAST_RUN_TIMESTAMP = Gauge(
+    "retention_last_run_timestamp_seconds", "Unix time the last purge of a table finished.", ("table",))
+
+METRICS = [
+    REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_DB_QUERIES, DB_QUERY_SECONDS,
+    BCRYPT_SECONDS, BCRYPT_QUEUE_WAIT_SECONDS, SMTP_SEND_SECONDS, SMTP_CONNECT_SECONDS,
+    DB_POOL_CHECKOUT_SECONDS, DB_POOL_OVERFLOW_TOTAL, DB_POOL_TIMEOUTS_TOTAL, DB_POOL_PINGS_TOTAL,
+    DB_POOL_CONNECTIONS, DB_READ_ROUTES_TOTAL,
+    PERMISSION_LOOKUPS_TOTAL, PERMISSION_REFRESH_SECONDS, PERMISSION_REFRESH_ERRORS_TOTAL, PERMISSION_MATRIX_ENTRIES,
+    RETENTION_ROWS_PURGED_TOTAL, RETENTION_BATCH_SECONDS, RETENTION_LAST_RUN_TIMESTAMP,
+]
+
+_collectors: List[Callable[[], None]] = []
+
+
+def register_collector(collector: Callable[[], None]) -> None:
+    """`collector` is called before every render, to refresh gauges."""
+    _collectors.append(collector)
+
+
+async def require_metrics_token(request: Request) -> None:
+    """Route dependency for /api/metrics; 404 while METRICS_TOKEN is unset, 401 on a wrong token."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+
+def render() -> str:
+    for collector in _collectors:
+        collector()
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- per-request DB accounting ----
+# [db_seconds, queries] of the current request, None outside requests
+_request_db: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = _request_db.get()
+    if stats is not None:
+        stats[0] += elapsed
+        stats[1] += 1
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(sync_engine) -> None:
+    """Time every statement on `sync_engine` (for an AsyncEngine pass .sync_engine)."""
+    if not METRICS_ENABLED:
+        return
+    _sql.event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    _sql.event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _sql.event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """Pure ASGI; labels requests with the matched route template, not the raw path."""
+
+    def __init__(self, app, enabled: bool = METRICS_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db_stats = [0.0, 0]
+        token = _request_db.set(db_stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(elapsed, scope["method"], route_path, str(status))
+            REQUEST_DB_SECONDS.observe(db_stats[0], route_path)
+            REQUEST_DB_QUERIES.observe(db_stats[1], route_path)
@@ -0,0 +1,52 @@
+# app/core/openapi.py
+"""
+OpenAPI schema, built at most once per process (or not at all).
+
+FastAPI generates the schema on the first /openapi.json (or /docs) request by
+walking every route and its pydantic models, ~20 ms here, and a serverless
+instance pays that again after every cold start. install() makes app.openapi
+serve OPENAPI_SCHEMA_FILE when it exists and otherwise build and cache the
+schema as usual. Write the file at build/deploy time:
+
+    python -m app.core.openapi openapi.json
+"""
+import json
+import os
+import sys
+
+OPENAPI_SCHEMA_FILE = os.getenv("OPENAPI_SCHEMA_FILE", "")
+
+
+def install(app, schema_file: str = OPENAPI_SCHEMA_FILE) -> None:
+    build = app.openapi
+
+    def openapi():
+        if app.openapi_schema is None:
+            if schema_file and os.path.isfile(schema_file):
+                with open(schema_file, "rb") as f:
+                    app.openapi_schema = json.load(f)
+            else:
+                app.openapi_schema = build()
+        return app.openapi_schema
+
+    openapi.build = build
+    app.openapi = openapi
+
+
+def write_schema(app, path: str) -> None:
+    # the /openapi.json route adds root_path to `servers` before the first build; do the same
+    if app.root_path and app.root_path_in_servers and app.root_path not in {s.get("url") for s in app.servers}:
+        app.servers.insert(0, {"url": app.root_path})
+    app.openapi_schema = None
+    schema = app.openapi.build() if hasattr(app.openapi, "build") else app.openapi()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, separators=(",", ":"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python -m app.core.openapi <output.json>")
+    import main
+
+    write_schema(main.app, sys.argv[1])
+    print(f"wrote {sys.argv[1]}")
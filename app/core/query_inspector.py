@@ -0,0 +1,277 @@
+# app/core/query_inspector.py
+"""
+Development/staging query inspector: N+1, slow statements and seq scans, per endpoint.
+
+Every statement executed while a request is in flight is fingerprinted
+(literals and IN-lists collapsed, whitespace normalized) and counted per
+request. When the request ends:
+
+* a fingerprint seen QUERY_N_PLUS_ONE_THRESHOLD or more times is an N+1 finding
+* a statement slower than QUERY_SLOW_MS is a slow-query finding
+* with QUERY_EXPLAIN_SAMPLE_RATE > 0 a sample of SELECT shapes (each at most
+  once per process, remembering the last QUERY_EXPLAIN_MAX_SHAPES) is
+  EXPLAINed on the same connection, and sequential scans are reported
+  (PostgreSQL "Seq Scan", SQLite "SCAN <table>"). On PostgreSQL the EXPLAIN
+  runs inside a savepoint, so if it fails the request's transaction goes on
+
+Findings are logged as warnings and aggregated per route, together with the
+statement/commit mix of each route, at GET /api/debug/queries.
+
+Off unless QUERY_INSPECTOR_ENABLED=true; it costs a regex pass per new
+statement shape and a dict update per statement, which is fine outside production.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import sqlalchemy as _sql
+
+logger = logging.getLogger("uvicorn.error")
+
+QUERY_INSPECTOR_ENABLED = os.getenv("QUERY_INSPECTOR_ENABLED", "false").lower() == "true"
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "100"))
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "3"))
+QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+QUERY_INSPECTOR_MAX_SHAPES = int(os.getenv("QUERY_INSPECTOR_MAX_SHAPES", "200"))  # per route
+QUERY_EXPLAIN_MAX_SHAPES = int(os.getenv("QUERY_EXPLAIN_MAX_SHAPES", "2000"))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Statement shape: literals -> ?, placeholder lists -> (?+), whitespace collapsed."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER_LIST.sub("(?+)", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class _RequestQueries:
+    __slots__ = ("shapes", "slow", "seq_scans", "commits")
+
+    def __init__(self):
+        self.shapes: Dict[str, list] = {}  # shape -> [count, seconds]
+        self.slow: List[tuple] = []  # (shape, seconds)
+        self.seq_scans: List[tuple] = []  # (shape, tables)
+        self.commits = 0
+
+
+_current: contextvars.ContextVar[Optional[_RequestQueries]] = contextvars.ContextVar("query_inspector", default=None)
+
+
+class Report:
+    """Per-route aggregate of what the requests of that route executed and what was flagged."""
+
+    def __init__(self, max_shapes: int = QUERY_INSPECTOR_MAX_SHAPES):
+        self.max_shapes = max_shapes
+        self._routes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _route(self, route: str) -> dict:
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = {"requests": 0, "statements": 0, "commits": 0, "shapes": {}, "findings": {}}
+        return entry
+
+    def _finding(self, entry: dict, kind: str, shape: str) -> dict:
+        key = f"{kind}:{shape}"
+        finding = entry["findings"].get(key)
+        if finding is None:
+            finding = entry["findings"][key] = {"kind": kind, "statement": shape, "occurrences": 0}
+        finding["occurrences"] += 1
+        return finding
+
+    def add(self, route: str, queries: _RequestQueries) -> List[str]:
+        """Fold one request in; returns log lines for what it flagged."""
+        messages = []
+        with self._lock:
+            entry = self._route(route)
+            entry["requests"] += 1
+            entry["commits"] += queries.commits
+            for shape, (count, seconds) in queries.shapes.items():
+                entry["statements"] += count
+                stats = entry["shapes"].get(shape)
+                if stats is None and len(entry["shapes"]) < self.max_shapes:
+                    stats = entry["shapes"][shape] = {"count": 0, "seconds": 0.0}
+                if stats is not None:
+                    stats["count"] += count
+                    stats["seconds"] += seconds
+                if count >= QUERY_N_PLUS_ONE_THRESHOLD:
+                    finding = self._finding(entry, "n_plus_one", shape)
+                    finding["max_per_request"] = max(finding.get("max_per_request", 0), count)
+                    messages.append(f"N+1 on {route}: {count}x {shape[:200]}")
+            for shape, seconds in queries.slow:
+                finding = self._finding(entry, "slow", shape)
+                finding["max_ms"] = max(finding.get("max_ms", 0.0), round(seconds * 1000, 2))
+                messages.append(f"slow query on {route}: {seconds * 1000:.1f} ms {shape[:200]}")
+            for shape, tables in queries.seq_scans:
+                finding = self._finding(entry, "seq_scan", shape)
+                finding["tables"] = tables
+                messages.append(f"seq scan on {route} ({', '.join(tables)}): {shape[:200]}")
+        return messages
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            routes = json.loads(json.dumps(self._routes))
+        for entry in routes.values():
+            requests = entry["requests"] or 1
+            entry["statements_per_request"] = round(entry["statements"] / requests, 2)
+            entry["commits_per_request"] = round(entry["commits"] / requests, 2)
+            entry["findings"] = list(entry["findings"].values())
+        return routes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+report = Report()
+
+
+# ---- sequential scan detection ----
+# shapes already EXPLAINed, oldest first; forgotten ones may be EXPLAINed again
+_explained: "OrderedDict[str, bool]" = OrderedDict()
+_explained_lock = threading.Lock()
+
+
+def _seq_scan_tables(dialect: str, cursor) -> List[str]:
+    rows = cursor.fetchall()
+    if dialect == "postgresql":
+        plan = rows[0][0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        tables, stack = [], [plan[0]["Plan"]]
+        while stack:
+            node = stack.pop()
+            if node.get("Node Type") == "Seq Scan":
+                tables.append(node.get("Relation Name", "?"))
+            stack.extend(node.get("Plans", []))
+        return tables
+    # sqlite: (id, parent, notused, detail), e.g. "SCAN user" vs "SEARCH user USING INDEX ..."
+    return [row[3].split()[1] for row in rows if row[3].startswith("SCAN ") and "CONSTANT ROW" not in row[3]]
+
+
+def _explain(conn, statement: str, parameters, shape: str) -> Optional[List[str]]:
+    dialect = conn.dialect.name
+    prefix = {"postgresql": "EXPLAIN (FORMAT JSON) ", "sqlite": "EXPLAIN QUERY PLAN "}.get(dialect)
+    if prefix is None:
+        return None
+    with _explained_lock:
+        _explained[shape] = True
+        while len(_explained) > QUERY_EXPLAIN_MAX_SHAPES:
+            _explained.popitem(last=False)
+    # this is the request's own connection: a failed statement would abort its transaction
+    savepoint = dialect == "postgresql"
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT query_inspector_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return _seq_scan_tables(dialect, cursor)
+        except Exception as e:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_inspector_explain")
+            logger.warning(f"query inspector: EXPLAIN failed for {shape[:100]}: {e}")
+            return None
+        finally:
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT query_inspector_explain")
+    except Exception as e:
+        # no transaction to take a savepoint in (autocommit), or the rollback itself failed
+        logger.warning(f"query inspector: EXPLAIN skipped for {shape[:100]}: {e}")
+        return None
+    finally:
+        cursor.close()
+
+
+# ---- engine events ----
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inspector_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("inspector_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    queries = _current.get()
+    if queries is None:
+        # outside a request (workers, scripts): only slow statements are interesting
+        if elapsed * 1000 >= QUERY_SLOW_MS:
+            logger.warning(f"slow query outside a request: {elapsed * 1000:.1f} ms {fingerprint(statement)[:200]}")
+        return
+    shape = fingerprint(statement)
+    stats = queries.shapes.get(shape)
+    if stats is None:
+        stats = queries.shapes[shape] = [0, 0.0]
+    stats[0] += 1
+    stats[1] += elapsed
+    if elapsed * 1000 >= QUERY_SLOW_MS:
+        queries.slow.append((shape, elapsed))
+    if (
+        QUERY_EXPLAIN_SAMPLE_RATE > 0
+        and not executemany
+        and shape not in _explained
+        and statement.lstrip()[:6].upper() == "SELECT"
+        and random.random() < QUERY_EXPLAIN_SAMPLE_RATE
+    ):
+        tables = _explain(conn, statement, parameters, shape)
+        if tables:
+            queries.seq_scans.append((shape, tables))
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("inspector_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def _commit(conn):
+    queries = _current.get()
+    if queries is not None:
+        queries.commits += 1
+
+
+def instrument_engine(sync_engine) -> None:
+    """Attach the inspector to `sync_engine` (for an AsyncEngine pass .sync_engine)."""
+    if not QUERY_INSPECTOR_ENABLED:
+        return
+    _sql.event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    _sql.event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _sql.event.listen(sync_engine, "handle_error", _handle_error)
+    _sql.event.listen(sync_engine, "commit", _commit)
+
+
+class QueryInspectorMiddleware:
+    """Pure ASGI; opens a per-request statement log and folds it into `report` at the end."""
+
+    def __init__(self, app, enabled: bool = QUERY_INSPECTOR_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        queries = _RequestQueries()
+        token = _current.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            if queries.shapes or queries.commits:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                for message in report.add(route, queries):
+                    logger.warning(f"query inspector: {message}")
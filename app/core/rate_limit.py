@@ -0,0 +1,187 @@
+# app/core/rate_limit.py
+"""
+Token-bucket rate limiting for the auth endpoints.
+
+Rules are declared per route (see RATE_LIMITS in app.core.main_router) with an
+optional per-IP and per-email bucket. A bucket is a three-item list
+[tokens, last_refill, refill_window], kept in least recently used order; the
+middleware runs on the event loop, so buckets are only ever touched from one
+thread and need no locks. Throttled requests get
+429 with Retry-After.
+
+State is per process: with N workers the effective limit is N times the rule.
+"""
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+# how often a full table is scanned for idle buckets; in between it drops the least recently used
+RATE_LIMIT_SWEEP_SECONDS = float(os.getenv("RATE_LIMIT_SWEEP_SECONDS", "10"))
+# proxies in front of the app that append to X-Forwarded-For (1 behind Vercel or a
+# single load balancer); 0 keys on the peer address. Entries left of the last
+# RATE_LIMIT_TRUSTED_PROXIES are whatever the client sent, so they are never used.
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
+
+@dataclass(frozen=True)
+class Rate:
+    """`requests` per `seconds`, allowing bursts of up to `requests`."""
+    requests: int
+    seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.requests / self.seconds
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    per_ip: Optional[Rate] = None
+    per_email: Optional[Rate] = None
+
+
+class TokenBuckets:
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS, sweep_seconds: float = RATE_LIMIT_SWEEP_SECONDS):
+        self.max_buckets = max_buckets
+        self.sweep_seconds = sweep_seconds
+        # key -> [tokens, last_refill, seconds to refill completely (the rule's window)]
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._swept_at = float("-inf")
+
+    def take(self, key: Tuple[str, str], rate: Rate, now: float) -> float:
+        """Take one token; returns 0 if allowed, else seconds until a token is available."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._evict(now)
+            self._buckets[key] = [rate.requests - 1, now, rate.seconds]
+            return 0.0
+        self._buckets.move_to_end(key)
+        tokens = min(rate.requests, bucket[0] + (now - bucket[1]) * rate.refill_per_second)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate.refill_per_second
+
+    def _evict(self, now: float) -> None:
+        # drop buckets that have refilled within their own rule's window (they carry no
+        # state); the scan is O(n), so it runs at most once per sweep_seconds and a
+        # full table of busy buckets otherwise costs one least recently used pop
+        if now - self._swept_at >= self.sweep_seconds:
+            self._swept_at = now
+            idle = [key for key, (_, last, window) in self._buckets.items() if now - last >= window]
+            for key in idle:
+                del self._buckets[key]
+        while len(self._buckets) >= self.max_buckets:
+            self._buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def _client_ip(scope, trusted_proxies: int = RATE_LIMIT_TRUSTED_PROXIES) -> str:
+    if trusted_proxies > 0:
+        # several X-Forwarded-For headers read as one list, in order
+        forwarded = [
+            entry.strip()
+            for name, value in scope["headers"] if name == b"x-forwarded-for"
+            for entry in value.split(b",")
+        ]
+        if forwarded:
+            # the address our outermost trusted proxy saw the request come from
+            return forwarded[-min(trusted_proxies, len(forwarded))].decode()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _too_many_requests(send, retry_after: float) -> None:
+    body = b'{"detail":"Too many requests"}'
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware; routes without a rule pass through after one dict lookup."""
+
+    def __init__(self, app, rules: Dict[str, RateLimit], enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.rules = rules
+        self.enabled = enabled
+        self.buckets = TokenBuckets()
+        self.throttled = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        root_path = scope.get("root_path")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        rule = self.rules.get(path)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        now = time.monotonic()
+        if rule.per_ip is not None:
+            retry_after = self.buckets.take((path, _client_ip(scope)), rule.per_ip, now)
+            if retry_after:
+                self.throttled += 1
+                return await _too_many_requests(send, retry_after)
+
+        if rule.per_email is not None:
+            body, receive = await self._buffer_body(receive)
+            email = self._email_of(body)
+            if email:
+                retry_after = self.buckets.take((path, "email:" + email), rule.per_email, now)
+                if retry_after:
+                    self.throttled += 1
+                    return await _too_many_requests(send, retry_after)
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _buffer_body(receive):
+        """Read the request body and hand downstream a receive() that replays it."""
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay
+
+    @staticmethod
+    def _email_of(body: bytes) -> Optional[str]:
+        try:
+            email = json.loads(body).get("email")
+        except (ValueError, AttributeError):
+            return None
+        return email.strip().lower() if isinstance(email, str) else None
@@ -0,0 +1,43 @@
+# app/core/responses.py
+"""
+JSON response classes and precompiled response serializers.
+
+For a route with a response_model FastAPI validates the returned value
+against the model (ORM objects included), dumps the model back to Python
+primitives, and then json.dumps the result. Serializer does the validation
+once, with a TypeAdapter built at import, and lets pydantic-core write the
+JSON bytes. The Response it returns goes out as is. Keep response_model on
+the route so it still shows up in the OpenAPI schema.
+
+DefaultJSONResponse is the app-wide default_response_class. It is
+ORJSONResponse when orjson is installed and the stdlib-based JSONResponse
+otherwise.
+"""
+from typing import Any, Dict, Generic, Optional, Type, TypeVar
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+T = TypeVar("T")
+
+
+class Serializer(Generic[T]):
+    def __init__(self, type_: Type[T]):
+        self.adapter = TypeAdapter(type_)
+
+    def validate(self, value: Any) -> T:
+        # from_attributes: nested ORM objects (e.g. the User in an auth response) are read directly
+        return self.adapter.validate_python(value, from_attributes=True)
+
+    def dump(self, value: Any) -> bytes:
+        return self.adapter.dump_json(self.validate(value))
+
+    def response(self, value: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+        return Response(content=self.dump(value), status_code=status_code, headers=headers, media_type="application/json")
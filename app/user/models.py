@@ -3,10 +3,9 @@ import datetime as _dt
 from enum import Enum as _PyEnum
 import sqlalchemy as _sql
 from sqlalchemy.sql import func
+from fastapi import HTTPException
 import app.core.db.session as _database
-from passlib.context import CryptContext
-
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.Shared import password_hasher as _hasher
 
 
 class RoleStatus(str, _PyEnum):
@@ -20,6 +19,11 @@ class AccountStatus(str, _PyEnum):
     deleted = "deleted"
 
 
+class UserType(str, _PyEnum):
+    user = "user"
+    staff = "staff"
+
+
 class AuthProvider(str, _PyEnum):
     local = "local"
     google = "google"
@@ -46,6 +50,10 @@ class User(_database.Base):
     # status & role
     account_status = _sql.Column(_sql.Enum(AccountStatus, name="account_status"), default=AccountStatus.active, nullable=False)
     profile_type_id = _sql.Column(_sql.Integer, nullable=True)
+    user_type = _sql.Column(_sql.String(20), nullable=False, default=UserType.user.value, server_default=UserType.user.value)
+    role_id = _sql.Column(_sql.Integer, nullable=True)  # staff role (app.Shared.permissions)
+    # bumped to void every token issued before (app.Shared.token_claims)
+    token_version = _sql.Column(_sql.Integer, nullable=False, default=0, server_default="0")
 
     # contact & address
     phone = _sql.Column(_sql.String(20), nullable=True)
@@ -74,17 +82,26 @@ class User(_database.Base):
     # soft delete
     is_deleted = _sql.Column(_sql.Boolean, default=False, nullable=False)
 
+    __table_args__ = (
+        # keyset pagination of user listings (app.Shared.pagination)
+        _sql.Index("ix_user_created_at_id", created_at.desc(), id.desc()),
+        # only the revoked users, for the revocation epoch reload (app.Shared.token_claims)
+        _sql.Index("ix_user_token_version_revoked", id, token_version, postgresql_where=token_version > 0),
+    )
+
     def set_password(self, password: str) -> None:
         try:
-            safe_pass = password[:72]   # bcrypt max length
-            self.password_hash = pwd_ctx.hash(safe_pass)
+            # truncated to bcrypt's max length by the hasher
+            self.password_hash = _hasher.hash_password_sync(password)
         except Exception as e:
             # Handle or log the exception as needed
             raise e
 
     def verify_password(self, plain_password: str) -> bool:
         try:
-            return pwd_ctx.verify(plain_password[:72], self.password_hash)
+            return _hasher.verify_password_sync(plain_password, self.password_hash)
+        except HTTPException:
+            raise
         except Exception:
             return False
 
@@ -121,17 +138,51 @@ class PlanType(_database.Base):
 class OTP(_database.Base):
     __tablename__ = "auth_otps"
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
-    email = _sql.Column(_sql.String(255), index=True, nullable=False)
+    email = _sql.Column(_sql.String(255), nullable=False)
     otp = _sql.Column(_sql.String(32), nullable=False)
     purpose = _sql.Column(_sql.String(50), nullable=True)
     created_at = _sql.Column(_sql.DateTime, default=_dt.datetime.utcnow)
     used = _sql.Column(_sql.Boolean, default=False)
 
+    # matches the "latest unused OTP for email+purpose" lookup in otp_store.SqlOtpStore
+    __table_args__ = (
+        _sql.Index("ix_auth_otps_email_purpose_used_created_at", email, purpose, used, created_at.desc()),
+    )
+
 
 class RefreshToken(_database.Base):
     __tablename__ = "auth_refresh_tokens"
     id = _sql.Column(_sql.Integer, primary_key=True, index=True)
     user_id = _sql.Column(_sql.Integer, nullable=False)
-    token = _sql.Column(_sql.Text, nullable=False)
+    token = _sql.Column(_sql.Text, nullable=True)  # legacy plaintext, no longer written
+    token_hash = _sql.Column(_sql.String(64), unique=True, index=True, nullable=False)  # sha256 hex of the JWT
     created_at = _sql.Column(_sql.DateTime, default=_dt.datetime.utcnow)
     revoked = _sql.Column(_sql.Boolean, default=False)
+
+
+class Role(_database.Base):
+    __tablename__ = "role"
+    id = _sql.Column(_sql.Integer, primary_key=True, index=True, autoincrement=True)
+    name = _sql.Column(_sql.String(50), nullable=False)
+    status = _sql.Column(_sql.Enum(RoleStatus, name="role_status"), default=RoleStatus.active, nullable=False)
+    is_deleted = _sql.Column(_sql.Boolean, default=False, nullable=False)
+
+
+class Resource(_database.Base):
+    __tablename__ = "resource"
+    id = _sql.Column(_sql.Integer, primary_key=True, index=True, autoincrement=True)
+    name = _sql.Column(_sql.String(100), unique=True, nullable=False)
+    is_deleted = _sql.Column(_sql.Boolean, default=False, nullable=False)
+
+
+class Permission(_database.Base):
+    __tablename__ = "permission"
+    id = _sql.Column(_sql.Integer, primary_key=True, index=True, autoincrement=True)
+    role_id = _sql.Column(_sql.Integer, nullable=False)
+    resource_id = _sql.Column(_sql.Integer, nullable=False)
+    access_type = _sql.Column(_sql.String(20), nullable=False, default="no_access")  # full_access | write | read | no_access
+    updated_at = _sql.Column(_sql.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        _sql.UniqueConstraint("role_id", "resource_id", name="uq_permission_role_resource"),
+    )
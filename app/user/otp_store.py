@@ -0,0 +1,200 @@
+# app/user/otp_store.py
+"""
+Where OTPs live between send-otp and verify-otp.
+
+OTPs are short-lived, so they don't have to go through the primary database.
+Every backend keeps only the latest OTP per (email, purpose) as far as
+verification is concerned, and enforces expiry itself:
+
+* "sql"    - auth_otps table (default, the historical behaviour)
+* "memory" - in-process dict with expiry; per worker, so only for single-process deployments
+* "redis"  - any Redis-protocol server (SET EX + atomic compare-and-delete)
+
+Selected with OTP_STORE, TTL with OTP_TTL_SECONDS.
+"""
+import abc
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import sqlalchemy as _sql
+from starlette.concurrency import run_in_threadpool
+
+import app.user.models as _models
+
+OTP_STORE = os.getenv("OTP_STORE", "sql").lower()
+OTP_STORE_URL = os.getenv("OTP_STORE_URL", "redis://localhost:6379/0")
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", str(15 * 60)))
+
+
+class OtpStore(abc.ABC):
+    """
+    `db` is the request's session; only the SQL backend uses it.
+    The async variants default to the sync ones, which is fine for non-blocking backends.
+    """
+
+    def __init__(self, ttl_seconds: int = OTP_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    @abc.abstractmethod
+    def save(self, db, email: str, otp: str, purpose: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def consume(self, db, email: str, otp: str, purpose: str) -> bool:
+        """Mark the latest OTP for email+purpose as used iff it matches and hasn't expired."""
+
+    async def asave(self, db, email: str, otp: str, purpose: str) -> None:
+        self.save(db, email, otp, purpose)
+
+    async def aconsume(self, db, email: str, otp: str, purpose: str) -> bool:
+        return self.consume(db, email, otp, purpose)
+
+
+class SqlOtpStore(OtpStore):
+    def consume_statement(self, email: str, otp: str, purpose: str):
+        """
+        Single UPDATE ... RETURNING that marks the latest unused OTP for email+purpose as used,
+        if and only if it matches `otp` and hasn't expired. The latest row is locked
+        FOR UPDATE so two concurrent verifications can't both consume it.
+        """
+        latest = (
+            _sql.select(_models.OTP.id)
+            .where(_models.OTP.email == email, _models.OTP.purpose == purpose, _models.OTP.used == False)
+            .order_by(_models.OTP.created_at.desc())
+            .limit(1)
+            .with_for_update()
+            .scalar_subquery()
+        )
+        return (
+            _sql.update(_models.OTP)
+            .where(
+                _models.OTP.id == latest,
+                _models.OTP.otp == otp,
+                _models.OTP.used == False,
+                _models.OTP.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl_seconds),
+            )
+            .values(used=True)
+            .returning(_models.OTP.id)
+            .execution_options(synchronize_session=False)
+        )
+
+    def save(self, db, email: str, otp: str, purpose: str) -> None:
+        db.add(_models.OTP(email=email, otp=otp, purpose=purpose))
+        db.commit()
+
+    def consume(self, db, email: str, otp: str, purpose: str) -> bool:
+        consumed = db.execute(self.consume_statement(email, otp, purpose)).scalar() is not None
+        db.commit()
+        return consumed
+
+    async def asave(self, db, email: str, otp: str, purpose: str) -> None:
+        db.add(_models.OTP(email=email, otp=otp, purpose=purpose))
+        await db.commit()
+
+    async def aconsume(self, db, email: str, otp: str, purpose: str) -> bool:
+        result = await db.execute(self.consume_statement(email, otp, purpose))
+        consumed = result.scalar() is not None
+        await db.commit()
+        return consumed
+
+
+class MemoryOtpStore(OtpStore):
+    def __init__(self, ttl_seconds: int = OTP_TTL_SECONDS, maxsize: int = 100000):
+        super().__init__(ttl_seconds)
+        self.maxsize = maxsize
+        self._entries: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float) -> None:
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+    def save(self, db, email: str, otp: str, purpose: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                self._sweep(now)
+                if len(self._entries) >= self.maxsize:
+                    # still full of live OTPs: drop the one closest to expiry
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k][1])]
+            self._entries[(purpose, email)] = (otp, now + self.ttl_seconds)
+
+    def consume(self, db, email: str, otp: str, purpose: str) -> bool:
+        key = (purpose, email)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            stored, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False
+            if stored != otp:
+                return False
+            del self._entries[key]
+            return True
+
+
+# compare-and-delete, so a wrong guess doesn't burn the OTP and a right one can't be used twice
+_CONSUME_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisOtpStore(OtpStore):
+    def __init__(self, url: str = OTP_STORE_URL, ttl_seconds: int = OTP_TTL_SECONDS, client=None):
+        """`client` takes any redis-py compatible client, e.g. a fakeredis instance in tests."""
+        super().__init__(ttl_seconds)
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("OTP_STORE=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self._consume = client.register_script(_CONSUME_SCRIPT)
+
+    @staticmethod
+    def _key(email: str, purpose: str) -> str:
+        return f"otp:{purpose}:{email}"
+
+    def save(self, db, email: str, otp: str, purpose: str) -> None:
+        self.client.set(self._key(email, purpose), otp, ex=self.ttl_seconds)
+
+    def consume(self, db, email: str, otp: str, purpose: str) -> bool:
+        return bool(self._consume(keys=[self._key(email, purpose)], args=[otp]))
+
+    async def asave(self, db, email: str, otp: str, purpose: str) -> None:
+        await run_in_threadpool(self.save, db, email, otp, purpose)
+
+    async def aconsume(self, db, email: str, otp: str, purpose: str) -> bool:
+        return await run_in_threadpool(self.consume, db, email, otp, purpose)
+
+
+_store: Optional[OtpStore] = None
+
+
+def get_store() -> OtpStore:
+    global _store
+    if _store is None:
+        if OTP_STORE == "memory":
+            _store = MemoryOtpStore()
+        elif OTP_STORE == "redis":
+            _store = RedisOtpStore()
+        elif OTP_STORE == "sql":
+            _store = SqlOtpStore()
+        else:
+            raise RuntimeError(f"Unknown OTP_STORE '{OTP_STORE}'")
+    return _store
+
+
+def set_store(store: OtpStore) -> None:
+    """Swap the backend, e.g. for tests."""
+    global _store
+    _store = store
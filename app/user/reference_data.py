@@ -0,0 +1,149 @@
+# app/user/reference_data.py
+"""
+Cached reference data: countries, sources, plan types, profile types.
+
+These tables change a few times a year, yet every dropdown on the frontend
+read them from the database. Each dataset is loaded once, serialized to JSON
+bytes up front and served with a strong ETag, so repeat requests cost a dict
+lookup and clients that send If-None-Match get an empty 304.
+
+A dataset is reloaded on its next request after invalidate() (call it after
+editing the table) or once it is older than REFERENCE_DATA_TTL_SECONDS, which
+bounds staleness across workers that didn't see the invalidate().
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import sqlalchemy as _sql
+from fastapi import HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+import app.core.db.routing as _routing
+import app.user.models as _models
+
+logger = logging.getLogger("uvicorn.error")
+
+REFERENCE_DATA_TTL_SECONDS = float(os.getenv("REFERENCE_DATA_TTL_SECONDS", "300"))
+REFERENCE_DATA_MAX_AGE = int(os.getenv("REFERENCE_DATA_MAX_AGE", "3600"))
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type
+    columns: Tuple[str, ...]
+    not_found: str
+    soft_delete: bool = True
+
+
+DATASETS: Dict[str, Dataset] = {
+    "countries": Dataset(_models.Country, ("id", "country", "country_code"), "No countries found"),
+    "sources": Dataset(_models.Source, ("id", "source"), "No sources found", soft_delete=False),
+    "plan_types": Dataset(_models.PlanType, ("id", "name"), "No plan types found"),
+    "profile_types": Dataset(_models.ProfileType, ("id", "name"), "No profile types found"),
+}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    body: bytes
+    etag: str
+    count: int
+    version: int
+    loaded_at: float
+
+
+class ReferenceDataCache:
+    def __init__(self, datasets: Dict[str, Dataset] = DATASETS, ttl_seconds: float = REFERENCE_DATA_TTL_SECONDS, session_factory=None):
+        self.datasets = datasets
+        self.ttl_seconds = ttl_seconds
+        self._session_factory = session_factory or _routing.ReadSessionLocal
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._versions: Dict[str, int] = {name: 0 for name in datasets}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "not_modified": 0}
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Bump the version of `name` (or of every dataset)."""
+        for key in [name] if name else list(self._versions):
+            self._versions[key] += 1
+
+    def _fresh(self, name: str) -> Optional[Snapshot]:
+        snapshot = self._snapshots.get(name)
+        if (
+            snapshot is None
+            or snapshot.version != self._versions[name]
+            or time.monotonic() - snapshot.loaded_at > self.ttl_seconds
+        ):
+            return None
+        return snapshot
+
+    def _load(self, name: str) -> Snapshot:
+        dataset = self.datasets[name]
+        version = self._versions[name]
+        query = _sql_select(dataset)
+        db = self._session_factory()
+        try:
+            rows = db.execute(query).all()
+        finally:
+            db.close()
+        body = json.dumps([dict(zip(dataset.columns, row)) for row in rows], separators=(",", ":")).encode()
+        snapshot = Snapshot(
+            body=body,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            count=len(rows),
+            version=version,
+            loaded_at=time.monotonic(),
+        )
+        self._snapshots[name] = snapshot
+        self.stats["loads"] += 1
+        logger.debug(f"reference data '{name}' loaded: {len(rows)} rows, {len(body)} bytes")
+        return snapshot
+
+    def get(self, name: str) -> Snapshot:
+        snapshot = self._fresh(name)
+        if snapshot is not None:
+            self.stats["hits"] += 1
+            return snapshot
+        with self._lock:
+            return self._fresh(name) or self._load(name)
+
+    async def aget(self, name: str) -> Snapshot:
+        snapshot = self._fresh(name)
+        if snapshot is not None:
+            self.stats["hits"] += 1
+            return snapshot
+        return await run_in_threadpool(self.get, name)
+
+    def respond(self, name: str, request: Request, snapshot: Snapshot) -> Response:
+        if not snapshot.count:
+            raise HTTPException(status_code=404, detail=self.datasets[name].not_found)
+        headers = {"ETag": snapshot.etag, "Cache-Control": f"public, max-age={REFERENCE_DATA_MAX_AGE}"}
+        if _etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def _sql_select(dataset: Dataset):
+    query = _sql.select(*(getattr(dataset.model, column) for column in dataset.columns)).order_by(dataset.model.id)
+    if dataset.soft_delete:
+        query = query.where(dataset.model.is_deleted == False)
+    return query
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+cache = ReferenceDataCache()
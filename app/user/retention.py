@@ -0,0 +1,168 @@
+# app/user/retention.py
+"""
+Retention job for auth_otps and auth_refresh_tokens.
+
+Both tables only grow (every send-otp and every login inserts a row), which
+bloats the indexes the auth lookups depend on. Rows past their retention are
+deleted in small primary-key batches, each in its own short transaction, with
+a pause between batches so the purge never holds long locks or saturates the
+database.
+
+Runs in a background thread when RETENTION_ENABLED=true (started from the app
+lifespan), or on demand:
+
+    python -m app.user.retention --once
+
+Rows purged and time per batch are exported on /api/metrics (retention_*).
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import sqlalchemy as _sql
+
+import app.core.db.session as _database
+import app.user.models as _models
+from app.core import config as _config
+from app.core import metrics as _metrics
+
+logger = logging.getLogger("uvicorn.error")
+
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true"
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.1"))
+OTP_RETENTION_SECONDS = int(os.getenv("OTP_RETENTION_SECONDS", str(60 * 60 * 24)))  # 1 day
+REFRESH_TOKEN_RETENTION_SECONDS = int(os.getenv("REFRESH_TOKEN_RETENTION_SECONDS", str(60 * 60 * 24 * 7)))  # 7 days
+
+
+def _otp_condition(now: datetime):
+    # used or not, an OTP is worthless long before this
+    return _models.OTP.created_at < now - timedelta(seconds=OTP_RETENTION_SECONDS)
+
+
+def _refresh_token_condition(now: datetime):
+    expired = _models.RefreshToken.created_at < now - _config.get_settings().refresh_token_expire
+    revoked = _sql.and_(
+        _models.RefreshToken.revoked == True,
+        _models.RefreshToken.created_at < now - timedelta(seconds=REFRESH_TOKEN_RETENTION_SECONDS),
+    )
+    return _sql.or_(expired, revoked)
+
+
+# table name -> (model, purge condition)
+POLICIES: Dict[str, tuple] = {
+    _models.OTP.__tablename__: (_models.OTP, _otp_condition),
+    _models.RefreshToken.__tablename__: (_models.RefreshToken, _refresh_token_condition),
+}
+
+def _record_batch(table: str, rows: int, elapsed: float) -> None:
+    # exported on /api/metrics
+    _metrics.RETENTION_ROWS_PURGED_TOTAL.inc(rows, table)
+    _metrics.RETENTION_BATCH_SECONDS.observe(elapsed, table)
+
+
+def purge_table(table: str, stop: Callable[[], bool] = lambda: False) -> int:
+    """Delete everything matching the table's policy, one primary-key batch per transaction."""
+    model, condition = POLICIES[table]
+    now = datetime.utcnow()
+    last_id = 0
+    purged = 0
+    while not stop():
+        started = time.perf_counter()
+        db = _database.SessionLocal()
+        try:
+            ids: List[int] = db.execute(
+                _sql.select(model.id)
+                .where(model.id > last_id, condition(now))
+                .order_by(model.id)
+                .limit(RETENTION_BATCH_SIZE)
+            ).scalars().all()
+            if not ids:
+                break
+            db.execute(_sql.delete(model).where(model.id.in_(ids)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        last_id = ids[-1]
+        purged += len(ids)
+        _record_batch(table, len(ids), time.perf_counter() - started)
+        if len(ids) < RETENTION_BATCH_SIZE:
+            break
+        time.sleep(RETENTION_BATCH_PAUSE_SECONDS)
+    _metrics.RETENTION_LAST_RUN_TIMESTAMP.set(time.time(), table)
+    return purged
+
+
+def run_once(stop: Callable[[], bool] = lambda: False) -> Dict[str, int]:
+    results = {}
+    for table in POLICIES:
+        try:
+            results[table] = purge_table(table, stop)
+        except Exception as e:
+            logger.error(f"retention: purging {table} failed: {e}")
+            results[table] = 0
+    logger.info(f"retention: purged {results}")
+    return results
+
+
+class RetentionWorker(threading.Thread):
+    def __init__(self, interval: int = RETENTION_INTERVAL_SECONDS):
+        super().__init__(name="retention-worker", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            run_once(self._stop_event.is_set)
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_worker = None
+
+
+def start() -> None:
+    global _worker
+    if not RETENTION_ENABLED or _worker is not None:
+        return
+    _worker = RetentionWorker()
+    _worker.start()
+
+
+def stop() -> None:
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge expired OTPs and revoked/expired refresh tokens.")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--table", choices=sorted(POLICIES), help="only purge this table")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.table:
+        print(f"{args.table}: {purge_table(args.table)} rows purged")
+    elif args.once:
+        run_once()
+    else:
+        worker = RetentionWorker()
+        worker.start()
+        try:
+            worker.join()
+        except KeyboardInterrupt:
+            worker.stop()
+    for metric in (_metrics.RETENTION_ROWS_PURGED_TOTAL, _metrics.RETENTION_BATCH_SECONDS):
+        print("\n".join(metric.render()))
@@ -1,6 +1,6 @@
 # app/user/schema.py
 from typing import Optional, List
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from datetime import datetime
 
 
@@ -85,8 +85,23 @@ class UserOut(BaseModel):
     is_verified: Optional[bool] = False
     created_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CountryOut(BaseModel):
+    id: int
+    country: str
+    country_code: Optional[str] = None
+
+
+class SourceOut(BaseModel):
+    id: int
+    source: str
+
+
+class LookupOut(BaseModel):
+    id: int
+    name: str
 
 
 class AuthLoginResp(BaseModel):
@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
 from typing import Optional, Tuple, Dict, Any, List
-import os
 import logging
 
 import sqlalchemy.orm as _orm
@@ -9,13 +8,13 @@ from fastapi import HTTPException
 import app.user.models as _models
 import app.user.schema as _schemas
 import app.core.db.session as _database
+import app.core.db.routing as _routing
+import app.user.otp_store as _otp_store
 from app.Shared import helpers as _helpers
+from app.Shared import token_claims as _claims
 
 logger = logging.getLogger("uvicorn.error")
 
-# environment / defaults
-ACCESS_TOKEN_EXPIRE = int(os.getenv("ACCESS_TOKEN_EXPIRE_SECONDS", "900"))
-
 # DB dependency
 def get_db():
     db = _database.SessionLocal()
@@ -25,52 +24,45 @@ def get_db():
         db.close()
 
 
+# read-only DB dependency: a replica when DATABASE_REPLICA_URLS is set, else the primary
+def get_read_db():
+    db = _routing.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 # Basic helpers for DB queries
 def check_email_exists(db: _orm.Session, email: str) -> bool:
+    _routing.read_your_writes(db, email)
     return db.query(_models.User).filter(_models.User.email == email, _models.User.is_deleted == False).first() is not None
 
 
 def check_username_available(db: _orm.Session, username: str) -> bool:
     if not username:
         return False
+    _routing.read_your_writes(db, username)
     return db.query(_models.User).filter(_models.User.username == username, _models.User.is_deleted == False).first() is None
 
 
-def save_otp(db: _orm.Session, email: str, otp: str, purpose: str = "verify") -> _models.OTP:
-    record = _models.OTP(email=email, otp=otp, purpose=purpose)
-    db.add(record)
-    db.commit()
-    db.refresh(record)
-    return record
-
-
-def get_latest_otp(db: _orm.Session, email: str, purpose: str = "verify") -> Optional[_models.OTP]:
-    return (
-        db.query(_models.OTP)
-        .filter(_models.OTP.email == email, _models.OTP.purpose == purpose, _models.OTP.used == False)
-        .order_by(_models.OTP.created_at.desc())
-        .first()
-    )
+# OTPs go through the configured OtpStore, which also enforces expiry
+def save_otp(db: _orm.Session, email: str, otp: str, purpose: str = "verify") -> None:
+    _otp_store.get_store().save(db, email, otp, purpose)
 
 
-def mark_otp_used(db: _orm.Session, otp_record: _models.OTP) -> None:
-    otp_record.used = True
-    db.add(otp_record)
-    db.commit()
+def verify_otp(db: _orm.Session, email: str, otp_value: str, purpose: str = "verify") -> bool:
+    return _otp_store.get_store().consume(db, email, otp_value, purpose)
 
 
-def verify_otp(db: _orm.Session, email: str, otp_value: str, purpose: str = "verify", expiry_seconds: int = 15 * 60) -> bool:
-    record = get_latest_otp(db, email, purpose)
-    if not record:
-        return False
-    age = datetime.utcnow() - record.created_at
-    if record.otp == otp_value and age.total_seconds() <= expiry_seconds:
-        mark_otp_used(db, record)
-        return True
-    return False
+# ----- Auth flows -----
+def _issue_tokens(user: _models.User) -> Tuple[str, str]:
+    # the claims spare authorization a user lookup on every request
+    access_token = _helpers.create_access_token(user.id, _claims.claims_for(user))
+    refresh_token = _helpers.create_refresh_token(user.id, user.token_version or 0)
+    return access_token, refresh_token
 
 
-# ----- Auth flows -----
 def register_user(db: _orm.Session, payload: _schemas.RegisterReq) -> Tuple[_models.User, str, str]:
     if check_email_exists(db, payload.email):
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -95,15 +87,15 @@ def register_user(db: _orm.Session, payload: _schemas.RegisterReq) -> Tuple[_mod
     db.commit()
     db.refresh(user)
 
-    access_payload = {"sub": {"user_id": user.id}}
-    access_token = _helpers.create_access_token(access_payload)
-    refresh_token = _helpers.create_refresh_token(access_payload)
+    access_token, refresh_token = _issue_tokens(user)
 
     # persist refresh token
-    rt = _models.RefreshToken(user_id=user.id, token=refresh_token)
+    rt = _models.RefreshToken(user_id=user.id, token_hash=_helpers.hash_token(refresh_token))
     db.add(rt)
     db.commit()
 
+    # replicas may lag behind this commit; read these keys from the primary for a while
+    _routing.recent_writes.mark(user.email, user.username, user.id)
     return user, access_token, refresh_token
 
 
@@ -119,16 +111,13 @@ def login_with_email(db: _orm.Session, email: str, password: str) -> Tuple[_mode
     if not user.password_hash:
         raise HTTPException(status_code=400, detail="Account does not have a password; use social login")
     
-    if not _helpers.pwd_ctx.verify(password, user.password_hash):
+    if not _helpers.verify_password(password, user.password_hash):
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
     # ✅ Correct payload: just user_id as sub
-    access_token = _helpers.create_access_token(user.id)
-    refresh_token = _helpers.create_refresh_token(user.id)
-    print("Access Token:", access_token)
-    print("Refresh Token:", refresh_token)
+    access_token, refresh_token = _issue_tokens(user)
     # Save refresh token in DB
-    rt = _models.RefreshToken(user_id=user.id, token=refresh_token)
+    rt = _models.RefreshToken(user_id=user.id, token_hash=_helpers.hash_token(refresh_token))
     db.add(rt)
     
     # update last_login
@@ -137,6 +126,7 @@ def login_with_email(db: _orm.Session, email: str, password: str) -> Tuple[_mode
     
     db.commit()
     
+    _routing.recent_writes.mark(user.email, user.username, user.id)
     return user, access_token, refresh_token
 
 
@@ -175,25 +165,24 @@ def login_with_google(db: _orm.Session, id_token: str) -> Tuple[_models.User, st
         db.commit()
         db.refresh(user)
 
-    access_payload = {"sub": {"user_id": user.id}}
-    access_token = _helpers.create_access_token(access_payload)
-    refresh_token = _helpers.create_refresh_token(access_payload)
+    access_token, refresh_token = _issue_tokens(user)
 
-    rt = _models.RefreshToken(user_id=user.id, token=refresh_token)
+    rt = _models.RefreshToken(user_id=user.id, token_hash=_helpers.hash_token(refresh_token))
     db.add(rt)
     db.commit()
 
+    _routing.recent_writes.mark(user.email, user.username, user.id)
     return user, access_token, refresh_token
 
 
 def _verify_refresh_token_record(db: _orm.Session, token: str) -> Optional[_models.RefreshToken]:
-    return db.query(_models.RefreshToken).filter(_models.RefreshToken.token == token, _models.RefreshToken.revoked == False).first()
+    return db.query(_models.RefreshToken).filter(_models.RefreshToken.token_hash == _helpers.hash_token(token), _models.RefreshToken.revoked == False).first()
 
 
 def refresh_access_token(db: _orm.Session, refresh_token: str) -> str:
     # Check token exists in DB and not revoked
     record = db.query(_models.RefreshToken).filter(
-        _models.RefreshToken.token == refresh_token,
+        _models.RefreshToken.token_hash == _helpers.hash_token(refresh_token),
         _models.RefreshToken.revoked == False
     ).first()
     
@@ -209,19 +198,35 @@ def refresh_access_token(db: _orm.Session, refresh_token: str) -> str:
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    # create new access token
-    return _helpers.create_access_token(int(user_id))
+    user = db.get(_models.User, int(user_id))
+    if not user or user.is_deleted or payload.get("ver", 0) < (user.token_version or 0):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # create new access token with the user's current claims
+    return _helpers.create_access_token(user.id, _claims.claims_for(user))
 
 
 
 def revoke_refresh_token(db: _orm.Session, token: str) -> None:
-    record = db.query(_models.RefreshToken).filter(_models.RefreshToken.token == token).first()
+    record = db.query(_models.RefreshToken).filter(_models.RefreshToken.token_hash == _helpers.hash_token(token)).first()
     if record:
         record.revoked = True
         db.add(record)
         db.commit()
 
 
+def revoke_user_tokens(db: _orm.Session, user: _models.User) -> None:
+    """Void every token issued to `user` so far: access tokens through token_version, refresh tokens in their table."""
+    user.token_version = (user.token_version or 0) + 1
+    db.query(_models.RefreshToken).filter(
+        _models.RefreshToken.user_id == user.id,
+        _models.RefreshToken.revoked == False
+    ).update({"revoked": True}, synchronize_session=False)
+    db.add(user)
+    db.commit()
+    _claims.revocations.invalidate()
+
+
 def logout_user(db: _orm.Session, refresh_token: Optional[str] = None) -> bool:
     if refresh_token:
         revoke_refresh_token(db, refresh_token)
@@ -230,10 +235,12 @@ def logout_user(db: _orm.Session, refresh_token: Optional[str] = None) -> bool:
 
 # ---- User queries ----
 def get_user_by_email(db: _orm.Session, email: str) -> Optional[_models.User]:
+    _routing.read_your_writes(db, email)
     return db.query(_models.User).filter(_models.User.email == email, _models.User.is_deleted == False).first()
 
 
 def get_user_by_id(db: _orm.Session, user_id: int) -> Optional[_models.User]:
+    _routing.read_your_writes(db, user_id)
     return db.query(_models.User).filter(_models.User.id == user_id, _models.User.is_deleted == False).first()
 
 
@@ -255,6 +262,6 @@ def reset_password_using_otp(db: _orm.Session, email: str, otp_value: str, new_p
         raise HTTPException(status_code=404, detail="User not found")
 
     user.set_password(new_password)
-    db.add(user)
-    db.commit()
+    # sessions opened with the old password end here
+    revoke_user_tokens(db, user)
     return True
@@ -8,23 +8,19 @@ import app.user.models as _models
 import app.user.service as _services
 import app.Shared.schema as _h_schema
 import app.core.db.session as _database
-import pika
 import logging
 import datetime
 from datetime import datetime as _dt
 import fastapi.security as _security
 import app.Shared.helpers as _helpers
+from app.Shared.dependencies import get_module_permission, get_pagination_options
+from app.Shared.pagination import KeysetPaginator
 
 router = APIRouter()
 
 logger = logging.getLogger("uvicorn.error")
 logger.setLevel(logging.DEBUG)
 
-login_attempts: Dict[str, int] = {}
-lockout_expiry: Dict[str, datetime.datetime] = {}
-MAX_ATTEMPTS = 3
-LOCKOUT_TIME = datetime.timedelta(minutes=30)
-
 def get_db():
     db = _database.SessionLocal()
     try:
@@ -32,6 +28,22 @@ def get_db():
     finally:
         db.close()
 
+
+users_paginator = KeysetPaginator(_models.User.created_at, _models.User.id)
+
+
+@router.get("/users", response_model=_h_schema.Page[_h_schema.UserOut], tags=["Users"])
+def list_users(
+    request: Request,
+    pagination: Annotated[_h_schema.PaginationOptions, Depends(get_pagination_options)],
+    _: Annotated[None, Depends(get_module_permission("users", "read"))],
+    db: _orm.Session = Depends(_services.get_read_db),
+):
+    if request.state.user.get("user_type") != "staff":
+        raise HTTPException(status_code=403, detail="You don't have access")
+    query = db.query(_models.User).filter(_models.User.is_deleted == False)
+    return users_paginator.paginate(db, query, pagination)
+
 # @router.post("/organizations", response_model=_schemas.OrganizationRead, tags=["Organizations API"])
 # async def create_organization(org: _schemas.OrganizationCreate,request:Request,db: _orm.Session = Depends(get_db)):
 #     try:
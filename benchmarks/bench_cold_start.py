@@ -0,0 +1,139 @@
+"""
+Cold start: import-time profile of main.py and time to the first response.
+
+Starts --runs fresh interpreters the way a serverless instance does (no
+lifespan, nothing warmed up); each one imports main and then sends
+GET /api/healthcheck straight through the ASGI app. Reports:
+
+* the median wall time from process spawn to the first response, checked against --target-ms
+* the median `import main` time and first-request time measured inside the process
+* from one more run under `-X importtime` (which slows imports down, so it is
+  kept out of the timings), the self import time grouped by top-level package
+  and the slowest modules by cumulative time
+
+    python -m benchmarks.bench_cold_start --runs 7 --target-ms 1200
+    python -m benchmarks.bench_cold_start --top 40
+
+Exits with status 1 when the median time to first response is over the target.
+"""
+import argparse
+import collections
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def first_request():
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/healthcheck", "raw_path": b"/api/healthcheck",
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1), "server": ("localhost", 80),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await main.app(scope, receive, send)
+    return status[0]
+
+status = asyncio.run(first_request())
+responded = time.perf_counter()
+print("BENCH " + json.dumps({
+    "status": status, "import_ms": (imported - started) * 1000, "request_ms": (responded - imported) * 1000,
+    "responded_at": time.monotonic(),
+}), flush=True)
+"""
+
+
+def parse_importtime(stderr: str):
+    """`-X importtime` lines -> [(module, self_us, cumulative_us, depth)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        # one space after the bar, then two per nesting level
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def run_once(env, profile: bool = False):
+    command = [sys.executable, "-W", "ignore", "-c", CHILD]
+    if profile:
+        command[1:1] = ["-X", "importtime"]
+    # time.monotonic() is the same clock in both processes; the child's exit is not counted
+    spawned = time.monotonic()
+    proc = subprocess.run(command, env=env, capture_output=True, text=True)
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("BENCH ")), None)
+    if proc.returncode or line is None:
+        raise SystemExit(f"child failed ({proc.returncode}):\n{proc.stderr[-4000:]}")
+    result = json.loads(line[len("BENCH "):])
+    result["wall_ms"] = (result["responded_at"] - spawned) * 1000
+    result["modules"] = parse_importtime(proc.stderr)
+    return result
+
+
+def report(run: dict, top: int) -> None:
+    by_package = collections.Counter()
+    for name, self_us, _, _ in run["modules"]:
+        by_package[name.split(".")[0]] += self_us
+    total = sum(by_package.values())
+    print(f"\nself import time by top-level package (total {total / 1000:.1f} ms)")
+    for package, self_us in by_package.most_common(top):
+        print(f"  {package:<32} {self_us / 1000:>8.1f} ms {self_us / total:>6.1%}")
+
+    print("\nslowest modules by cumulative time (nested ones are included in their parents)")
+    for name, _, cumulative_us, depth in sorted(run["modules"], key=lambda row: -row[2])[:top]:
+        print(f"  {'  ' * min(depth, 6)}{name:<{48 - 2 * min(depth, 6)}} {cumulative_us / 1000:>8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--target-ms", type=float, default=float(os.getenv("COLD_START_TARGET_MS", "1500")))
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///./bench_cold_start.db")
+    env.setdefault("JWT_SECRET", "bench")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    # one throwaway run so .pyc files exist, as they do in a deployed bundle
+    run_once(env)
+    runs = [run_once(env) for _ in range(args.runs)]
+
+    wall = statistics.median(r["wall_ms"] for r in runs)
+    print(f"{'run':>4} {'status':>6} {'import ms':>10} {'1st req ms':>11} {'spawn->resp ms':>15}")
+    for i, r in enumerate(runs):
+        print(f"{i:>4} {r['status']:>6} {r['import_ms']:>10.1f} {r['request_ms']:>11.1f} {r['wall_ms']:>15.1f}")
+    print(
+        f"median {'':>4} {statistics.median(r['import_ms'] for r in runs):>10.1f} "
+        f"{statistics.median(r['request_ms'] for r in runs):>11.1f} {wall:>15.1f}"
+    )
+
+    if args.top:
+        report(run_once(env, profile=True), args.top)
+
+    verdict = "OK" if wall <= args.target_ms else "OVER TARGET"
+    print(f"\ntime to first response: {wall:.0f} ms (target {args.target_ms:.0f} ms) {verdict}")
+    if wall > args.target_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
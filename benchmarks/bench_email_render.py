@@ -0,0 +1,84 @@
+"""
+Renders/second of the OTP email: the old f-string + email.mime path vs the
+precompiled templates in app.Shared.email_templates.
+
+    python -m benchmarks.bench_email_render --iterations 20000
+"""
+import argparse
+import timeit
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from app.Shared import email_templates as _templates
+
+MESSAGE = (
+    "Thank you for choosing <strong>Link Nest</strong>. "
+    "Use the following OTP to complete your sign-up procedure. "
+    "This OTP is valid for <strong>5 minutes</strong>."
+)
+
+
+def legacy_html(otp: str, message: str) -> str:
+    # helpers.generate_otp_email_html before templates were precompiled
+    html_body = f"""
+    <div style="font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; min-width: 1000px; overflow: auto; line-height: 1.6; background-color: #f9f9f9; padding: 40px 0;">
+      <div style="margin: 0 auto; width: 600px; background-color: #ffffff; border-radius: 10px; box-shadow: 0 4px 20px rgba(0,0,0,0.05); overflow: hidden;">
+
+        <!-- Header -->
+        <div style="background-color: #1a73e8; padding: 20px; text-align: center;">
+          <a href="#" style="font-size: 1.6em; color: #ffffff; text-decoration: none; font-weight: 700;">Link Nest</a>
+        </div>
+
+        <!-- Body -->
+        <div style="padding: 30px 40px; text-align: center;">
+
+          <p style="font-size: 1em; color: #555555; margin-bottom: 30px;">
+            {message}
+          </p>
+
+          <!-- OTP -->
+          <div style="display: inline-block; background-color: #1a73e8; color: #ffffff; font-size: 1.5em; font-weight: 700; padding: 15px 25px; border-radius: 8px; letter-spacing: 3px;">
+            {otp}
+          </div>
+
+          <p style="font-size: 0.9em; color: #777777; margin-top: 30px;">
+            Regards,<br>
+            <strong>Link Nest Team</strong>
+          </p>
+        </div>
+
+      </div>
+    </div>
+    """
+    return html_body
+
+
+def legacy_message(otp: str) -> str:
+    message = MIMEMultipart("alternative")
+    message["From"] = "noreply@example.com"
+    message["To"] = "user@example.com"
+    message["Subject"] = "OTP from your application"
+    message.attach(MIMEText(legacy_html(otp, MESSAGE), "html"))
+    return message.as_string()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    cases = [
+        ("html: f-string", lambda: legacy_html("123456", MESSAGE)),
+        ("html: compiled template", lambda: _templates.OTP_HTML.render(message=MESSAGE, otp="123456")),
+        ("message: email.mime (html only)", lambda: legacy_message("123456")),
+        ("message: compiled (text + html)", lambda: _templates.build_otp_message(
+            "noreply@example.com", "user@example.com", "OTP from your application", "123456", MESSAGE)),
+    ]
+    for label, fn in cases:
+        elapsed = min(timeit.repeat(fn, number=n, repeat=3))
+        print(f"{label:<34} {n / elapsed:12.0f} renders/s")
+
+
+if __name__ == "__main__":
+    main()
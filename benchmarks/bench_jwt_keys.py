@@ -0,0 +1,81 @@
+"""
+Sign and verify cost of one access token per algorithm, in µs.
+
+* HS256    - the shared-secret setup (JWT_SECRET only)
+* EdDSA    - Ed25519 key from app.Shared.signing_keys
+* ES256    - P-256 key from app.Shared.signing_keys
+
+For the asymmetric keys, `verify (JWK)` builds the public key from its JWKS
+entry for every token, which is what a verifier without a key cache pays;
+`verify` uses the parsed key held by KeyRing / JWKSKeySet. Either way no
+verifier has to call back to this app.
+
+    python -m benchmarks.bench_jwt_keys --iterations 5000
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "bench-secret-bench-secret-bench-secret")
+
+import jwt
+
+from app.Shared import signing_keys as _keys
+
+CLAIMS = {
+    "user_type": "staff", "role_id": 3, "plan_type_id": 1, "account_status": "active", "ver": 0,
+    "sub": "4211", "type": "access", "iat": int(time.time()), "exp": int(time.time()) + 900,
+}
+
+
+def timed(fn, iterations: int) -> float:
+    for _ in range(min(iterations // 10, 200)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    secret = os.environ["JWT_SECRET"].encode()
+    hs_ring = _keys.KeyRing([], secret)
+    hs_token = hs_ring.encode(CLAIMS)
+    rows.append((
+        "HS256",
+        timed(lambda: hs_ring.encode(CLAIMS), args.iterations),
+        timed(lambda: hs_ring.decode(hs_token), args.iterations),
+        None,
+    ))
+
+    for alg in _keys.ALGORITHMS:
+        ring = _keys.KeyRing(_keys.load_keys(json.dumps([_keys.generate_key(alg, f"bench-{alg}")])))
+        token = ring.encode(CLAIMS)
+        jwk = json.loads(ring.jwks_json())["keys"][0]
+
+        def verify_jwk(token=token, jwk=jwk, alg=alg):
+            return jwt.decode(token, jwt.PyJWK(jwk).key, algorithms=[alg])
+
+        assert verify_jwk() == ring.decode(token)
+        rows.append((
+            alg,
+            timed(lambda: ring.encode(CLAIMS), args.iterations),
+            timed(lambda: ring.decode(token), args.iterations),
+            timed(verify_jwk, args.iterations),
+        ))
+
+    print(f"{'alg':<8} {'sign µs':>9} {'verify µs':>10} {'verify (JWK) µs':>16}")
+    for alg, sign_us, verify_us, jwk_us in rows:
+        jwk = f"{jwk_us:>16.1f}" if jwk_us is not None else f"{'-':>16}"
+        print(f"{alg:<8} {sign_us:>9.1f} {verify_us:>10.1f} {jwk}")
+
+
+if __name__ == "__main__":
+    main()
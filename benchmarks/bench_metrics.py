@@ -0,0 +1,82 @@
+"""
+Per-request overhead of MetricsMiddleware and of the SQL cursor events.
+
+Drives the middleware directly with synthetic ASGI requests (no server, no
+network) and reports µs/request against a bare passthrough app, spread over
+--routes route templates. Then runs --queries trivial SELECTs on an
+in-memory SQLite engine with and without instrument_engine and reports the
+added µs/statement.
+
+    python -m benchmarks.bench_metrics --requests 200000 --queries 50000
+"""
+import argparse
+import asyncio
+import time
+
+import sqlalchemy as _sql
+
+from app.core import metrics as _metrics
+from app.core.metrics import MetricsMiddleware
+
+
+class _Route:
+    def __init__(self, path: str):
+        self.path = path
+
+
+async def downstream(scope, receive, send):
+    scope["route"] = scope["_bench_route"]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def noop_send(message):
+    pass
+
+
+async def drive(app, requests: int, routes: int) -> float:
+    scopes = [
+        {"type": "http", "method": "GET", "path": f"/api/r{i}", "headers": [], "_bench_route": _Route(f"/api/r{i}")}
+        for i in range(routes)
+    ]
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(dict(scopes[i % routes]), receive, noop_send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def run_queries(engine, queries: int) -> float:
+    with engine.connect() as conn:
+        statement = _sql.text("SELECT 1")
+        start = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(statement).scalar()
+        return (time.perf_counter() - start) / queries * 1e6
+
+
+async def main(requests: int, routes: int, queries: int) -> None:
+    baseline = await drive(downstream, requests, routes)
+    instrumented = await drive(MetricsMiddleware(downstream, enabled=True), requests, routes)
+    print(f"{'passthrough app':<28} {baseline:6.2f} µs/request")
+    print(f"{'MetricsMiddleware':<28} {instrumented:6.2f} µs/request  (+{instrumented - baseline:.2f} µs)")
+
+    plain = run_queries(_sql.create_engine("sqlite://"), queries)
+    engine = _sql.create_engine("sqlite://")
+    _metrics.instrument_engine(engine)
+    timed = run_queries(engine, queries)
+    print(f"{'SELECT 1':<28} {plain:6.2f} µs/statement")
+    print(f"{'SELECT 1 + cursor events':<28} {timed:6.2f} µs/statement  (+{timed - plain:.2f} µs)")
+    print(f"render(): {len(_metrics.render())} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--routes", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.routes, args.queries))
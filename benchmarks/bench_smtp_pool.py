@@ -0,0 +1,118 @@
+"""
+Messages/second through a local fake SMTP server, with and without pooling.
+
+The fake server speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, NOOP,
+RSET, QUIT) and adds a fixed per-connection handshake delay to stand in for
+the TCP + STARTTLS + AUTH round-trips of a real provider.
+
+    python -m benchmarks.bench_smtp_pool --messages 500 --threads 8 --handshake-ms 50
+"""
+import argparse
+import asyncio
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.Shared.smtp_pool import SMTPConnectionPool
+
+MESSAGE = "Subject: OTP\r\n\r\nYour code is 123456\r\n"
+
+
+class FakeSMTPServer:
+    def __init__(self, handshake_delay: float):
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+        self.messages = 0
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await asyncio.sleep(self.handshake_delay)
+        writer.write(b"220 fake ESMTP\r\n")
+        in_data = False
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    self.messages += 1
+                    writer.write(b"250 OK queued\r\n")
+                continue
+            command = line[:4].upper()
+            if command == b"EHLO":
+                writer.write(b"250-fake\r\n250 PIPELINING\r\n")
+            elif command == b"DATA":
+                in_data = True
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:  # HELO, MAIL, RCPT, NOOP, RSET
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> "FakeSMTPServer":
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+        return self
+
+
+def send_unpooled(port: int) -> None:
+    # what helpers.send_email used to do for every message
+    server = smtplib.SMTP("127.0.0.1", port)
+    server.sendmail("noreply@example.com", "user@example.com", MESSAGE)
+    server.quit()
+
+
+def timed(label: str, total: int, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {total / elapsed:9.1f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=50)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    fake = FakeSMTPServer(args.handshake_ms / 1000).start()
+    pool = SMTPConnectionPool("127.0.0.1", fake.port, max_sessions=args.threads, starttls=False)
+
+    def fan_out(fn):
+        with ThreadPoolExecutor(args.threads) as executor:
+            list(executor.map(lambda _: fn(), range(args.messages)))
+
+    timed("unpooled", args.messages, lambda: fan_out(lambda: send_unpooled(fake.port)))
+    timed("pooled", args.messages, lambda: fan_out(
+        lambda: pool.send("noreply@example.com", "user@example.com", MESSAGE)))
+
+    batch = [("noreply@example.com", "user@example.com", MESSAGE)] * args.batch
+    batches = args.messages // args.batch
+    with ThreadPoolExecutor(args.threads) as executor:
+        timed(f"pooled send_many({args.batch})", batches * args.batch,
+              lambda: list(executor.map(lambda _: pool.send_many(batch), range(batches))))
+
+    pool.close()
+    print(f"server saw {fake.connections} connections for {fake.messages} messages; pool stats {pool.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import time
+from contextlib import asynccontextmanager
 from typing import Annotated
 from fastapi import (
     Depends,
@@ -11,24 +12,37 @@ from fastapi import (
     Response,
     status,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.security import (
     HTTPAuthorizationCredentials,
     HTTPBearer,
-    OAuth2PasswordBearer,
 )
-from fastapi_sqlalchemy import DBSessionMiddleware
-import jwt
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
 from starlette.status import HTTP_401_UNAUTHORIZED
-from app.core.main_router import router as main_router
+# loads .env once, before any module below reads its settings; see get_settings()
+from app.core import config as _config
+import app.core.db.session as _database
+from app.core.main_router import router as main_router, RATE_LIMITS
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.core.query_inspector import QUERY_INSPECTOR_ENABLED, QueryInspectorMiddleware
 from app.user import user_router
+from app.user import retention as _retention
+from app.Shared import helpers as _helpers
+from app.Shared import token_claims as _claims
+from app.Shared import signing_keys as _signing_keys
+from app.Shared import password_hasher as _hasher
+from app.Shared import email_queue as _email_queue
+from app.core import logger as _logger
+from app.core import openapi as _openapi
+from app.core import responses as _responses
 
-load_dotenv(".env")
-JWT_SECRET = os.getenv("JWT_SECRET", "")
-JWT_EXPIRY = os.getenv("JWT_EXPIRY", "")
+if _logger.LOG_PIPELINE:
+    _logger.init_logging()
+settings = _config.get_settings()
+# parse JWT_KEYS now so a bad key fails the deploy, not the first login
+_signing_keys.get_key_ring()
 ROOT_PATH = "/fastapi"
 
 bearer_scheme = HTTPBearer()
@@ -46,18 +60,50 @@ async def authorization(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-    except:
+        # signature, `exp` and `token_time` + JWT_EXPIRY are checked once per token, then cached
+        payload = _helpers.decode_token(token)
+    except HTTPException:
         raise token_expection
-    if (time.time() - payload["token_time"]) > int(JWT_EXPIRY):
+    if payload.get("type") != "access":
         raise token_expection
+    # user_type, role_id, ... come from the token's claims; only revocations are checked, in memory
+    if _claims.revocations.stale():
+        # reloads at most once per REVOCATION_CACHE_TTL_SECONDS, off the event loop
+        await run_in_threadpool(_claims.revocations.refresh)
+    if _claims.revocations.is_revoked(payload):
+        raise token_expection
+    if payload.get("account_status", "active") != "active":
+        raise HTTPException(status_code=403, detail="Account is not active")
     request.state.user = payload
 
 
 root_router = APIRouter(dependencies=[Depends(authorization)])
 
-app = FastAPI(title="Link Nest APIs", root_path=ROOT_PATH, swagger_ui_parameters={'displayRequestDuration': True})
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _hasher.start()
+    _retention.start()
+    _email_queue.start()
+    yield
+    _email_queue.stop()
+    _helpers.smtp_pool.close()
+    _retention.stop()
+    _hasher.shutdown()
+    _logger.stop_logging()
+
+
+app = FastAPI(
+    title="Link Nest APIs",
+    root_path=ROOT_PATH,
+    lifespan=lifespan,
+    swagger_ui_parameters={'displayRequestDuration': True},
+    default_response_class=_responses.DefaultJSONResponse,
+)
+_openapi.install(app)
+
+# added first so it sits inside CORS and 429s still carry CORS headers
+app.add_middleware(RateLimitMiddleware, rules=RATE_LIMITS)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -65,12 +111,20 @@ app.add_middleware(
     allow_headers=["*"],
     allow_credentials=True,
 )
+if QUERY_INSPECTOR_ENABLED:
+    app.add_middleware(QueryInspectorMiddleware)
+# added last so it's the outermost layer: throttled requests and CORS preflights are timed too
+app.add_middleware(MetricsMiddleware)
 
-app.include_router(main_router)
+if _database.ASYNC_DB:
+    from app.core.async_router import router as async_router
+    app.include_router(async_router)
+else:
+    app.include_router(main_router)
 root_router.include_router(user_router)
 app.include_router(root_router)
 
-AUTH_BASE_URL = os.environ.get("AUTH_BASE_URL")
+AUTH_BASE_URL = settings.auth_base_url
 # logging.basicConfig(level=logging.INFO)
 
 
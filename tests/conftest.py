@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+
+# before any app module is imported: no .env, a throwaway SQLite database
+os.environ["ENV_FILE"] = os.devnull
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "test-secret-test-secret-test-secret")
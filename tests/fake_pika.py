@@ -0,0 +1,159 @@
+# tests/fake_pika.py
+"""
+In-process stand-in for a RabbitMQ broker behind pika.BlockingConnection.
+
+Models what RabbitEmailQueue relies on: queue_declare with arguments (a
+redeclare with different ones fails, like PRECONDITION_FAILED), default
+exchange routing, per-message `expiration` and per-queue x-message-ttl
+(whichever is sooner), dead-lettering of expired messages through
+x-dead-letter-exchange/-routing-key, manual acks.
+
+Time is a fake clock in milliseconds. start_consuming() delivers until the
+consumed queue is empty; when only expiring messages are left it advances
+the clock to the next expiry, so a whole retry schedule runs in one call.
+It returns when nothing is left to do instead of blocking.
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class ChannelClosed(Exception):
+    pass
+
+
+class Message:
+    def __init__(self, body: bytes, properties, published_at: int, ttl: bool = True):
+        """:param ttl: False once dead-lettered; the broker drops the per-message expiration."""
+        self.body = body
+        self.properties = properties
+        expiration = getattr(properties, "expiration", None) if ttl else None
+        self.expires_at = published_at + int(expiration) if expiration is not None else None
+
+
+class Broker:
+    def __init__(self):
+        self.now_ms = 0
+        self.queues: Dict[str, Deque[Message]] = {}
+        self.arguments: Dict[str, dict] = {}
+        self.durable: Dict[str, bool] = {}
+        self.unacked: Dict[int, Tuple[str, Message]] = {}
+        self.published: List[Tuple[str, Message]] = []
+        self.down = False
+        self.connections: List["Connection"] = []
+        self._tags = 0
+
+    def connect(self, parameters=None) -> "Connection":
+        if self.down:
+            raise ConnectionError("broker unreachable")
+        connection = Connection(self)
+        self.connections.append(connection)
+        return connection
+
+    def route(self, routing_key: str, message: Message) -> None:
+        # default exchange: straight to the queue of that name, dropped if there is none
+        if routing_key in self.queues:
+            ttl = self.arguments[routing_key].get("x-message-ttl")
+            if ttl is not None:
+                queued_until = self.now_ms + ttl
+                message.expires_at = queued_until if message.expires_at is None else min(message.expires_at, queued_until)
+            self.queues[routing_key].append(message)
+
+    def expire(self) -> None:
+        # like RabbitMQ, only messages at the head of a queue are expired
+        for name, queue in self.queues.items():
+            arguments = self.arguments[name]
+            while queue and queue[0].expires_at is not None and queue[0].expires_at <= self.now_ms:
+                message = queue.popleft()
+                if "x-dead-letter-routing-key" in arguments:
+                    self.route(arguments["x-dead-letter-routing-key"], Message(message.body, message.properties, self.now_ms, ttl=False))
+
+    def next_expiry(self) -> Optional[int]:
+        heads = [queue[0].expires_at for queue in self.queues.values() if queue and queue[0].expires_at is not None]
+        return min(heads, default=None)
+
+    def bodies(self, queue: str) -> List[bytes]:
+        return [message.body for message in self.queues[queue]]
+
+
+class Channel:
+    def __init__(self, connection: "Connection"):
+        self.connection = connection
+        self.broker = connection.broker
+        self.is_closed = False
+        self.prefetch_count = None
+        self._consumer = None
+        self._consuming = False
+
+    @property
+    def is_open(self) -> bool:
+        return not self.is_closed
+
+    def _check(self) -> None:
+        if self.is_closed or self.broker.down:
+            self.is_closed = True
+            raise ChannelClosed("channel closed")
+
+    def queue_declare(self, queue: str, durable: bool = False, arguments: Optional[dict] = None) -> None:
+        self._check()
+        arguments = arguments or {}
+        if queue in self.broker.queues:
+            if self.broker.arguments[queue] != arguments or self.broker.durable[queue] != durable:
+                raise ChannelClosed(f"PRECONDITION_FAILED - inequivalent arguments for queue '{queue}'")
+            return
+        self.broker.queues[queue] = deque()
+        self.broker.arguments[queue] = arguments
+        self.broker.durable[queue] = durable
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes, properties=None) -> None:
+        self._check()
+        assert exchange == "", "only the default exchange is modelled"
+        message = Message(body, properties, self.broker.now_ms)
+        self.broker.published.append((routing_key, message))
+        self.broker.route(routing_key, message)
+
+    def basic_qos(self, prefetch_count: int = 0) -> None:
+        self.prefetch_count = prefetch_count
+
+    def basic_consume(self, queue: str, on_message_callback) -> None:
+        self._check()
+        self._consumer = (queue, on_message_callback)
+
+    def basic_ack(self, delivery_tag: int) -> None:
+        self.broker.unacked.pop(delivery_tag)
+
+    def stop_consuming(self) -> None:
+        self._consuming = False
+
+    def start_consuming(self) -> None:
+        queue_name, callback = self._consumer
+        self._consuming = True
+        while self._consuming:
+            self._check()
+            self.broker.expire()
+            queue = self.broker.queues[queue_name]
+            if queue:
+                message = queue.popleft()
+                self.broker._tags += 1
+                tag = self.broker._tags
+                self.broker.unacked[tag] = (queue_name, message)
+                method = type("Deliver", (), {"delivery_tag": tag, "routing_key": queue_name})()
+                callback(self, method, message.properties, message.body)
+                continue
+            expiry = self.broker.next_expiry()
+            if expiry is None:
+                return
+            self.broker.now_ms = max(self.broker.now_ms, expiry)
+
+
+class Connection:
+    def __init__(self, broker: Broker):
+        self.broker = broker
+        self.channels: List[Channel] = []
+
+    def channel(self) -> Channel:
+        channel = Channel(self)
+        self.channels.append(channel)
+        return channel
+
+    def add_callback_threadsafe(self, callback) -> None:
+        callback()
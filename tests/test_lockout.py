@@ -0,0 +1,51 @@
+# tests/test_lockout.py
+"""MemoryLockoutStore eviction: sprayed failures must not push out a live lock."""
+from app.core import lockout as _lockout
+
+
+def make_store(maxsize=4):
+    return _lockout.MemoryLockoutStore(maxsize=maxsize, threshold=3, window_seconds=60, duration_seconds=60)
+
+
+def lock(store, identity):
+    return [store.register_failure(identity) for _ in range(store.threshold)][-1]
+
+
+def test_spray_does_not_evict_a_lock():
+    store = make_store()
+    assert lock(store, "victim@b.co") is True
+    for n in range(100):
+        store.register_failure(f"spray{n}@b.co")
+    assert store.locked_for("Victim@b.co") > 0
+
+
+def test_counters_are_evicted_least_recently_used_first():
+    store = make_store(maxsize=3)
+    store.register_failure("a@b.co")
+    store.register_failure("b@b.co")
+    store.register_failure("a@b.co")
+    store.register_failure("c@b.co")
+    store.register_failure("d@b.co")  # evicts b, not a
+    assert store.register_failure("a@b.co") is True
+    assert store.locked_for("a@b.co") > 0
+
+
+def test_new_emails_are_not_tracked_when_only_locks_are_left():
+    store = make_store(maxsize=2)
+    assert lock(store, "a@b.co") and lock(store, "b@b.co")
+    assert lock(store, "c@b.co") is False
+    assert store.locked_for("c@b.co") == 0
+    assert store.locked_for("a@b.co") > 0 and store.locked_for("b@b.co") > 0
+
+
+def test_expired_locks_make_room():
+    store = _lockout.MemoryLockoutStore(maxsize=1, threshold=1, window_seconds=60, duration_seconds=0)
+    assert store.register_failure("a@b.co") is True
+    assert store.register_failure("b@b.co") is True
+
+
+def test_reset_clears_the_lock():
+    store = make_store()
+    lock(store, "a@b.co")
+    store.reset("A@b.co")
+    assert store.locked_for("a@b.co") == 0
@@ -0,0 +1,70 @@
+# tests/test_otp_store.py
+"""RedisOtpStore against fakeredis, which runs the compare-and-delete Lua script (via lupa)."""
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from app.user import otp_store as _otp_store
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def store(client):
+    return _otp_store.RedisOtpStore(client=client, ttl_seconds=60)
+
+
+def test_consume_matching_otp_once(store):
+    store.save(None, "a@b.co", "123456", "verify")
+    assert store.consume(None, "a@b.co", "123456", "verify") is True
+    assert store.consume(None, "a@b.co", "123456", "verify") is False
+
+
+def test_wrong_guess_does_not_burn_the_otp(store):
+    store.save(None, "a@b.co", "123456", "verify")
+    assert store.consume(None, "a@b.co", "000000", "verify") is False
+    assert store.consume(None, "a@b.co", "123456", "verify") is True
+
+
+def test_latest_otp_wins_and_purposes_are_separate(store):
+    store.save(None, "a@b.co", "111111", "verify")
+    store.save(None, "a@b.co", "222222", "verify")
+    store.save(None, "a@b.co", "333333", "reset")
+    assert store.consume(None, "a@b.co", "111111", "verify") is False
+    assert store.consume(None, "a@b.co", "333333", "verify") is False
+    assert store.consume(None, "a@b.co", "222222", "verify") is True
+    assert store.consume(None, "a@b.co", "333333", "reset") is True
+
+
+def test_otp_is_saved_with_ttl(store, client):
+    store.save(None, "a@b.co", "123456", "verify")
+    assert 0 < client.ttl("otp:verify:a@b.co") <= 60
+
+
+def test_expired_otp_is_rejected(client):
+    store = _otp_store.RedisOtpStore(client=client, ttl_seconds=1)
+    store.save(None, "a@b.co", "123456", "verify")
+    time.sleep(1.1)
+    assert store.consume(None, "a@b.co", "123456", "verify") is False
+
+
+def test_async_variants(store):
+    async def flow():
+        await store.asave(None, "a@b.co", "123456", "verify")
+        return await store.aconsume(None, "a@b.co", "123456", "verify"), await store.aconsume(None, "a@b.co", "123456", "verify")
+
+    assert asyncio.run(flow()) == (True, False)
+
+
+def test_incomplete_backend_fails_at_construction():
+    class SaveOnly(_otp_store.OtpStore):
+        def save(self, db, email, otp, purpose):
+            pass
+
+    with pytest.raises(TypeError):
+        SaveOnly()